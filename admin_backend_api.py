@@ -14,15 +14,18 @@ from datetime import datetime, timedelta
 import json
 import re
 import subprocess
+import time
 
 # PDF Processing - Using pdfplumber (better than PyPDF2)
 import pdfplumber
 
-# Use YOUR embedding model (E5) instead of Mistral!
-from sentence_transformers import SentenceTransformer
+# Use YOUR embedding model (E5) instead of Mistral! (registre partagé)
+from config.settings import PDF_EMBEDDING_BATCH_SIZE
+from retrieval.embeddings import EmbeddingModel, get_startup_report
 
-# Use YOUR Pinecone setup
-from pinecone import Pinecone
+# Use YOUR vector store setup (Pinecone or local, see VECTOR_STORE_BACKEND)
+from retrieval.vectorstore import get_vector_store
+from retrieval.pdf_chunks import add_document_chunks, delete_document_chunks
 
 # Load environment variables
 load_dotenv()
@@ -37,13 +40,12 @@ app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max
 
 # Initialize E5 embedding model (SAME AS YOUR CHATBOT!)
 print("📥 Loading E5 embedding model...")
-embedding_model = SentenceTransformer("intfloat/multilingual-e5-large")
+embedding_model = EmbeddingModel()
 print("✅ E5 model loaded!")
 
-# Initialize Pinecone
-pinecone_client = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+# Initialize vector store
 PINECONE_INDEX = os.getenv('PINECONE_INDEX', 'shop-catalog')
-index = pinecone_client.Index(PINECONE_INDEX)
+store = get_vector_store(index_name=PINECONE_INDEX)
 
 # Admin users
 ADMIN_USERS = {
@@ -291,8 +293,11 @@ def add_products_to_catalog(products, catalog_path='products/catalog.json'):
     # Save catalog
     if added_count > 0:
         os.makedirs(os.path.dirname(catalog_path), exist_ok=True)
-        with open(catalog_path, 'w', encoding='utf-8') as f:
+        # Écriture atomique : l'index catalogue du chatbot ne lit jamais un fichier à moitié écrit
+        tmp_path = catalog_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(catalog, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, catalog_path)
         print(f"   💾 Catalog updated: +{added_count} products")
     
     return added_count
@@ -350,17 +355,13 @@ def chunk_text(text, chunk_size=500, chunk_overlap=100):
     return chunks
 
 
-def generate_embeddings_e5(texts):
-    """Generate embeddings using E5 model (SAME AS YOUR CHATBOT!)"""
-    embeddings = []
-    
-    for text in texts:
-        # Use PASSAGE prefix (same as your ingestion_catalog.py)
-        prefixed_text = f"passage: {text}"
-        embedding = embedding_model.encode(prefixed_text, normalize_embeddings=True).tolist()
-        embeddings.append(embedding)
-    
-    return embeddings
+def generate_embeddings_e5(texts, batch_size=PDF_EMBEDDING_BATCH_SIZE):
+    """Generate embeddings using E5 model (SAME AS YOUR CHATBOT!)
+
+    Chunks are encoded in batches of similar length (PASSAGE prefix,
+    same as ingest_catalog.py) instead of one forward pass per chunk.
+    """
+    return embedding_model.embed_passages(texts, batch_size=batch_size)
 
 
 def upload_to_pinecone(chunks, embeddings, metadata, extracted_products=None):
@@ -424,25 +425,16 @@ def upload_to_pinecone(chunks, embeddings, metadata, extracted_products=None):
             'metadata': vec_metadata
         })
     
-    # Upsert in batches
+    # One upsert call: the store batches itself (Pinecone requests / one local version)
     batch_size = 100
-    total_upserted = 0
-    
-    for i in range(0, len(vectors), batch_size):
-        batch = vectors[i:i + batch_size]
-        try:
-            print(f"   Upserting batch {i//batch_size + 1} ({len(batch)} vectors)...")
-            
-            # Upsert with explicit namespace
-            result = index.upsert(vectors=batch, namespace='')
-            
-            print(f"   Upsert result: {result}")
-            total_upserted += len(batch)
-        except Exception as e:
-            print(f"   ❌ Upsert error: {str(e)}")
-            raise Exception(f"Failed to upload to Pinecone: {str(e)}")
+    try:
+        print(f"   Upserting {len(vectors)} vectors...")
+        store.upsert(vectors, batch_size=batch_size)
+    except Exception as e:
+        print(f"   ❌ Upsert error: {str(e)}")
+        raise Exception(f"Failed to upload to vector store: {str(e)}")
     
-    return total_upserted
+    return len(vectors)
 
 
 # ========================================
@@ -466,6 +458,9 @@ def upload_pdf():
         return jsonify({'error': 'Only PDF files allowed'}), 400
     
     try:
+        timings = {}
+        upload_start = time.perf_counter()
+        
         # Generate document ID
         document_id = f"doc_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         filename = secure_filename(file.filename)
@@ -477,7 +472,9 @@ def upload_pdf():
         
         # Extract text
         print(f"📄 Extracting text from {filename}...")
+        stage_start = time.perf_counter()
         text = extract_text_from_pdf(filepath)
+        timings['extract_ms'] = round((time.perf_counter() - stage_start) * 1000, 1)
         
         if not text.strip():
             os.remove(filepath)
@@ -504,12 +501,16 @@ def upload_pdf():
         
         # Chunk text
         print(f"✂️  Chunking text...")
+        stage_start = time.perf_counter()
         chunks = chunk_text(text)
+        timings['chunk_ms'] = round((time.perf_counter() - stage_start) * 1000, 1)
         print(f"✅ Created {len(chunks)} chunks")
         
         # Generate E5 embeddings (SAME AS YOUR CHATBOT!)
         print(f"🧠 Generating E5 embeddings...")
+        stage_start = time.perf_counter()
         embeddings = generate_embeddings_e5(chunks)
+        timings['embed_ms'] = round((time.perf_counter() - stage_start) * 1000, 1)
         print(f"✅ Generated {len(embeddings)} embeddings")
         
         # Prepare metadata
@@ -525,7 +526,12 @@ def upload_pdf():
         
         # Upload to Pinecone (with product metadata)
         print(f"☁️  Uploading to Pinecone...")
+        stage_start = time.perf_counter()
         vector_count = upload_to_pinecone(chunks, embeddings, metadata, extracted_products)
+        add_document_chunks(document_id, filename, chunks)  # local copy for BM25
+        timings['upsert_ms'] = round((time.perf_counter() - stage_start) * 1000, 1)
+        timings['total_ms'] = round((time.perf_counter() - upload_start) * 1000, 1)
+        print(f"⏱️  Timings: {timings}")
         print(f"✅ Uploaded {vector_count} vectors")
         
         # Save document metadata
@@ -559,7 +565,8 @@ def upload_pdf():
                 'added_to_catalog': added_count,
                 'catalog_updated': catalog_updated,
                 'products': [p['name'] for p in extracted_products] if extracted_products else []
-            }
+            },
+            'timings': timings
         })
     
     except Exception as e:
@@ -573,7 +580,7 @@ def list_documents():
     """List all uploaded documents"""
     try:
         documents = load_documents()
-        stats = index.describe_index_stats()
+        stats = store.stats()
         
         return jsonify({
             'success': True,
@@ -595,8 +602,9 @@ def delete_document(document_id):
     try:
         print(f"🗑️  Deleting document {document_id}...")
         
-        # Delete from Pinecone
-        index.delete(filter={'document_id': document_id})
+        # Delete from vector store
+        store.delete(filter={'document_id': document_id})
+        delete_document_chunks(document_id)
         
         # Remove from metadata
         documents = load_documents()
@@ -633,14 +641,12 @@ def search_test():
         print(f"🔍 Searching with E5: {query}")
         
         # Generate query embedding with E5 (use "query:" prefix)
-        query_text = f"query: {query}"
-        query_embedding = embedding_model.encode(query_text, normalize_embeddings=True).tolist()
+        query_embedding = embedding_model.embed_query(query)
         
-        # Search Pinecone
-        results = index.query(
+        # Search vector store
+        results = store.query(
             vector=query_embedding,
-            top_k=top_k,
-            include_metadata=True
+            top_k=top_k
         )
         
         # Format results
@@ -674,7 +680,7 @@ def search_test():
 def get_stats():
     """Get admin statistics"""
     try:
-        stats = index.describe_index_stats()
+        stats = store.stats()
         documents = load_documents()
         
         total_size = sum(doc.get('file_size', 0) for doc in documents)
@@ -707,7 +713,8 @@ def health_check():
         'timestamp': datetime.now().isoformat(),
         'embedding_model': 'intfloat/multilingual-e5-large',
         'pinecone_index': PINECONE_INDEX,
-        'features': ['auto-extraction', 'catalog-integration', 'pdfplumber', 'e5']
+        'features': ['auto-extraction', 'catalog-integration', 'pdfplumber', 'e5'],
+        'startup': get_startup_report()
     })
 
 
@@ -12,9 +12,21 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import your existing components
-from core.agent import CommercialAgent
+from core.agent import CommercialAgent, get_tool_stats
 from core.state_manager import ConversationState
+from core.intents import get_router_stats
+from core.responses import get_render_stats
+from core.speculation import get_speculation_stats
+from core.prompt_builder import get_prompt_stats
+from core.working_set import get_working_set_stats
+from catalog.index import get_catalog_index
+from retrieval.retriever import get_retriever_stats
 from tools.contact import request_contact
+from retrieval.embeddings import (
+    get_startup_report,
+    get_query_cache_stats,
+    get_query_executor_stats,
+)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
@@ -95,7 +107,7 @@ def format_response(agent_response, conv):
             product = agent_response.get('product', {})
             return {
                 'type': 'product_image',
-                'message': f"🖼️ {product.get('name', 'Produit')}",
+                'message': agent_response.get('message') or f"🖼️ {product.get('name', 'Produit')}",
                 'product': {
                     'id': product.get('id'),
                     'name': product.get('name'),
@@ -103,7 +115,8 @@ def format_response(agent_response, conv):
                     'image_url': product.get('image_url'),
                     'in_stock': product.get('in_stock', True)
                 },
-                'conversation_id': list(conversations.keys())[list(conversations.values()).index(conv)]
+                'conversation_id': list(conversations.keys())[list(conversations.values()).index(conv)],
+                'pending_choice': agent_response.get('pending_choice')
             }
         
         # Add to cart
@@ -115,9 +128,10 @@ def format_response(agent_response, conv):
             
             return {
                 'type': 'cart_updated',
-                'message': f"✅ {product.get('name')} ajouté au panier !",
+                'message': agent_response.get('message') or f"✅ {product.get('name')} ajouté au panier !",
                 'cart': conv['cart'],
-                'conversation_id': list(conversations.keys())[list(conversations.values()).index(conv)]
+                'conversation_id': list(conversations.keys())[list(conversations.values()).index(conv)],
+                'pending_choice': agent_response.get('pending_choice')
             }
         
         # Contact agent
@@ -239,7 +253,26 @@ def health():
     return jsonify({
         'status': 'ok',
         'service': 'smartshop-chatbot',
-        'active_conversations': len(conversations)
+        'active_conversations': len(conversations),
+        'startup': get_startup_report()
+    })
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Performance counters (caches, retrieval)"""
+    return jsonify({
+        'query_embedding_cache': get_query_cache_stats(),
+        'query_embedding_batching': get_query_executor_stats(),
+        'working_set': get_working_set_stats(),
+        'retrieval': get_retriever_stats(),
+        'catalog': get_catalog_index().stats(),
+        'intent_router': get_router_stats(),
+        'post_tool_rendering': get_render_stats(),
+        'tools': get_tool_stats(),
+        'speculative_retrieval': get_speculation_stats(),
+        'prompt_tokens': get_prompt_stats(),
+        'conversation_memory': {cid: conv['agent'].memory.stats() for cid, conv in list(conversations.items())}
     })
 
 
@@ -251,6 +284,7 @@ def root():
         'status': 'running',
         'endpoints': {
             'health': '/api/health',
+            'metrics': '/api/metrics',
             'chat': '/api/chat',
             'cart': '/api/cart'
         }
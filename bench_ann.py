@@ -0,0 +1,98 @@
+"""
+Benchmark IVF-flat vs exact search - recall@k / latency report
+Usage:
+    python bench_ann.py                      # 200k synthetic vectors, dim 1024
+    python bench_ann.py --n 1000000 --nprobe 4 8 16 32 64
+    python bench_ann.py --store data/vectorstore   # vectors of the local store
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from retrieval.ann import IVFFlatIndex, exact_top_k
+
+
+def synthetic_vectors(n, dim, clusters, seed=0):
+    """Clustered, normalized vectors (closer to real embeddings than pure noise)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        end = min(n, start + 100_000)
+        labels = rng.integers(0, clusters, end - start)
+        block = centers[labels] + 0.5 * rng.normal(size=(end - start, dim)).astype(np.float32)
+        vectors[start:end] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return vectors
+
+
+def load_store_vectors(path):
+    # Segments of the published version (CURRENT), else the legacy flat layout
+    current = Path(path) / "CURRENT"
+    if current.exists():
+        segments = json.loads((Path(path) / current.read_text().strip() / "segments.json").read_text())["segments"]
+        vectors = np.concatenate([np.load(Path(path) / "segments" / f"{name}.npy") for name in segments])
+    else:
+        vectors = np.load(Path(path) / "vectors.npy")
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def timed(fn, queries):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--store", help="local vector store directory to benchmark instead of synthetic data")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = 4 * sqrt(n)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📐 IVF-flat vs exact search")
+    print("=" * 60)
+
+    vectors = load_store_vectors(args.store) if args.store else synthetic_vectors(args.n, args.dim, args.clusters)
+    n = vectors.shape[0]
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(n, args.queries, replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    nlist = args.nlist or max(1, int(4 * np.sqrt(n)))
+    print(f"Vectors: {n} x {vectors.shape[1]}  |  nlist: {nlist}  |  k: {args.k}")
+
+    start = time.perf_counter()
+    index = IVFFlatIndex(nlist)
+    index.train(vectors)
+    print(f"Training: {time.perf_counter() - start:.1f}s\n")
+
+    exact, exact_lat = timed(lambda q: exact_top_k(vectors, q, args.k)[0], queries)
+    truth = [set(rows.tolist()) for rows in exact]
+    print(f"{'mode':<12}{'recall@k':>10}{'mean ms':>10}{'p95 ms':>10}{'speedup':>10}")
+    print(f"{'exact':<12}{1.0:>10.3f}{exact_lat.mean():>10.2f}{np.percentile(exact_lat, 95):>10.2f}{1.0:>10.1f}")
+
+    for nprobe in args.nprobe:
+        if nprobe > nlist:
+            continue
+        approx, lat = timed(lambda q: index.search(vectors, q, args.k, nprobe=nprobe)[0], queries)
+        recall = np.mean([len(truth[i] & set(rows.tolist())) / args.k for i, rows in enumerate(approx)])
+        print(f"{'nprobe=' + str(nprobe):<12}{recall:>10.3f}{lat.mean():>10.2f}"
+              f"{np.percentile(lat, 95):>10.2f}{exact_lat.mean() / lat.mean():>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
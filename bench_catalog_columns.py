@@ -0,0 +1,112 @@
+"""
+Benchmark - product representation at scale
+Plain dataclass list + per-object filtering (old) vs slotted Product + ProductColumns masks
+
+Usage:
+    python bench_catalog_columns.py
+    python bench_catalog_columns.py --size 100000 --repeats 20
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Optional
+
+from catalog.columns import ProductColumns
+from catalog.schema import Product
+from catalog.validator import filter_available_products
+
+CATEGORIES = ["chaussures homme", "chemises homme", "montres", "casquettes", "baskets homme",
+              "robes femme", "sacs", "parfums", "ceintures", "boubous"]
+
+
+@dataclass
+class DictProduct:
+    """Previous representation (regular dataclass, one __dict__ per instance)."""
+    id: str
+    name: str
+    category: str
+    description: str
+    price: float
+    currency: str
+    in_stock: bool
+    stock_quantity: Optional[int] = None
+    image_url: Optional[str] = None
+    type: str = field(default="product", init=False)
+
+
+def make_rows(n, rng):
+    return [
+        dict(id=f"P-{i}", name=f"Produit {i}", category=rng.choice(CATEGORIES), description="",
+             price=float(rng.randrange(1000, 200000, 500)), currency="XOF",
+             in_stock=rng.random() > 0.1, stock_quantity=rng.choice([None, 0, 3, 12, 40]))
+        for i in range(n)
+    ]
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    objects = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objects, current
+
+
+def per_call_ms(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def list_filter(products, min_price, max_price, categories):
+    available = filter_available_products(products)
+    return [p for p in available
+            if min_price <= p.price <= max_price and p.category.lower() in categories]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.size, random.Random(0))
+    min_price, max_price, categories = 20000, 80000, {"chemises homme", "montres"}
+
+    old, old_bytes = measure_memory(lambda: [DictProduct(**r) for r in rows])
+    new, new_bytes = measure_memory(lambda: [Product(**r) for r in rows])
+    columns, columns_bytes = measure_memory(lambda: ProductColumns(new))
+
+    same = ([p.id for p in list_filter(old, min_price, max_price, categories)] ==
+            [p.id for p in columns.filter(min_price=min_price, max_price=max_price, categories=categories)])
+
+    timings = {
+        "availability": (
+            per_call_ms(lambda: filter_available_products(old), args.repeats),
+            per_call_ms(lambda: columns.available_mask(), args.repeats),
+        ),
+        "avail+price+category": (
+            per_call_ms(lambda: list_filter(old, min_price, max_price, categories), args.repeats),
+            per_call_ms(lambda: columns.mask(min_price=min_price, max_price=max_price,
+                                             categories=categories), args.repeats),
+        ),
+        "  ... + materialize": (
+            per_call_ms(lambda: list_filter(old, min_price, max_price, categories), args.repeats),
+            per_call_ms(lambda: columns.filter(min_price=min_price, max_price=max_price,
+                                               categories=categories), args.repeats),
+        ),
+    }
+
+    print(f"{args.size} products")
+    print(f"memory   dataclass list: {old_bytes / 1e6:6.1f} MB   slotted list: {new_bytes / 1e6:6.1f} MB   "
+          f"columns: {columns.nbytes() / 1e6:.1f} MB arrays, {columns_bytes / 1e6:.1f} MB with id map")
+    print(f"{'filter':<24}{'list ms':>10}{'masks ms':>10}{'speedup':>10}")
+    for name, (list_ms, mask_ms) in timings.items():
+        print(f"{name:<24}{list_ms:>10.2f}{mask_ms:>10.2f}{list_ms / mask_ms:>10.1f}")
+    print(f"same result: {'✅' if same else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Embedding backends - parity check + latency/throughput comparison
+Compares each backend against the fp32 torch reference on a held-out query set.
+
+Usage:
+    python bench_embedding_backends.py
+    python bench_embedding_backends.py --backends torch-int8 onnx-int8 --threshold 0.98
+    python bench_embedding_backends.py --model ./models/tiny-sbert --offline   # no download
+
+Exit code 1 if a backend fails the parity threshold.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from config.settings import EMBEDDING_MODEL_NAME
+
+# Held-out queries (never used for tuning)
+QUERIES = [
+    "chemise blanche homme",
+    "chemises blanches pour homme",
+    "chaussures en cuir pour le bureau",
+    "baskets légères pour courir",
+    "montre élégante pas chère",
+    "ceinture marron en cuir",
+    "costume bleu marine mariage",
+    "polo manches courtes été",
+    "jean slim noir",
+    "lunettes de soleil homme",
+    "sac à dos ordinateur portable",
+    "casquette sport",
+    "veste d'hiver chaude",
+    "sandales pour la plage",
+    "cravate en soie rouge",
+    "t-shirt coton bio",
+    "parfum homme frais",
+    "boubou traditionnel brodé",
+    "chaussettes pack de 5",
+    "je cherche un cadeau pour mon père",
+]
+
+
+def load_passages():
+    try:
+        from catalog.loader import load_catalog
+        return [f"{p.name}. {p.description}. {p.category}" for p in load_catalog()]
+    except Exception:
+        return QUERIES
+
+
+def encode(model, texts, prefix, batch_size=32):
+    return model.encode([f"{prefix}: {t}" for t in texts], batch_size=batch_size,
+                        normalize_embeddings=True)
+
+
+def measure(model, passages, repeats):
+    latencies = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            start = time.perf_counter()
+            model.encode(f"query: {query}", normalize_embeddings=True)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    encode(model, passages * repeats, "passage")
+    throughput = len(passages) * repeats / (time.perf_counter() - start)
+    return np.array(latencies), throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME, help="HF model name or local path")
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx", "onnx-int8"])
+    parser.add_argument("--threshold", type=float, default=0.98, help="min cosine vs fp32")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--offline", action="store_true", help="never hit the Hugging Face Hub")
+    args = parser.parse_args()
+
+    if args.offline:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+    from retrieval.embedding_backends import check_parity, load_sentence_transformer
+
+    passages = load_passages()
+    print("=" * 72)
+    print(f"🧪 Embedding backends - {args.model}")
+    print(f"   {len(QUERIES)} held-out queries, {len(passages)} passages, threshold {args.threshold}")
+    print("=" * 72)
+
+    reference = load_sentence_transformer(args.model, "torch")
+    ref_queries = encode(reference, QUERIES, "query")
+    ref_passages = encode(reference, passages, "passage")
+    ref_lat, ref_tput = measure(reference, passages, args.repeats)
+
+    print(f"{'backend':<12}{'mean cos':>10}{'min cos':>10}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'passages/s':>12}{'speedup':>9}  parity")
+    print(f"{'torch':<12}{1.0:>10.4f}{1.0:>10.4f}{np.median(ref_lat):>9.2f}"
+          f"{np.percentile(ref_lat, 95):>9.2f}{ref_tput:>12.1f}{1.0:>9.2f}  -")
+
+    failed = False
+    for backend in args.backends:
+        try:
+            model = load_sentence_transformer(args.model, backend)
+        except Exception as e:
+            print(f"{backend:<12}  ⚠️ unavailable: {e}")
+            continue
+
+        parity = check_parity(
+            np.vstack([ref_queries, ref_passages]),
+            np.vstack([encode(model, QUERIES, "query"), encode(model, passages, "passage")]),
+            args.threshold,
+        )
+        lat, tput = measure(model, passages, args.repeats)
+        failed |= not parity["passed"]
+        print(f"{backend:<12}{parity['mean_cosine']:>10.4f}{parity['min_cosine']:>10.4f}"
+              f"{np.median(lat):>9.2f}{np.percentile(lat, 95):>9.2f}{tput:>12.1f}"
+              f"{np.median(ref_lat) / np.median(lat):>9.2f}  {'✅' if parity['passed'] else '❌'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
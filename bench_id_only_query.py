@@ -0,0 +1,95 @@
+"""
+Benchmark - vector query payload: full metadata vs ID-only + local hydration
+Measures the JSON response size per query (what Pinecone sends over the wire)
+and the query -> decode -> hydrate latency on a local store.
+
+Usage:
+    python bench_id_only_query.py
+    python bench_id_only_query.py --products 2000 --chunks 5000 --top-k 6
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from catalog.schema import Product
+from retrieval.local_vectorstore import LocalVectorStore
+from retrieval.retriever import ProductRetriever, SEARCH_FILTER
+
+WORDS = ["chemise", "blanche", "chaussures", "cuir", "homme", "baskets", "sport", "montre",
+         "élégante", "ceinture", "marron", "costume", "bleu", "polo", "jean", "noir", "veste"]
+
+
+def build(args, rng, path):
+    store = LocalVectorStore(path=path, dimension=args.dim, recreate_index=True)
+    vectors, products, chunks = [], {}, {}
+    for i in range(args.products):
+        p = Product(id=f"P-{i}", name=" ".join(rng.choices(WORDS, k=4)), category="homme",
+                    description=" ".join(rng.choices(WORDS, k=30)), price=25000.0, currency="XOF",
+                    in_stock=True, stock_quantity=5, image_url=f"https://cdn.example.com/{i}.jpg")
+        products[p.id] = p
+        metadata = {f: getattr(p, f) for f in Product.__dataclass_fields__}
+        vectors.append({"id": p.id, "metadata": metadata})
+    for i in range(args.chunks):
+        chunk_id = f"doc_{i // 20}_chunk_{i % 20}"
+        text = " ".join(rng.choices(WORDS, k=200))[:1000]
+        chunks[chunk_id] = {"id": chunk_id, "text": text, "filename": "catalogue.pdf", "document_id": f"doc_{i // 20}"}
+        vectors.append({"id": chunk_id, "metadata": {
+            "document_id": f"doc_{i // 20}", "filename": "catalogue.pdf", "document_type": "product_catalog",
+            "chunk_index": i % 20, "total_chunks": 20, "text": text, "uploaded_at": "2026-01-01T00:00:00",
+            "uploaded_by": "admin", "type": "pdf_document"}})
+    matrix = np.random.default_rng(0).normal(size=(len(vectors), args.dim)).astype(np.float32)
+    for v, values in zip(vectors, matrix):
+        v["values"] = values.tolist()
+    store.upsert(vectors)
+    return store, products, chunks
+
+
+def run(store, queries, top_k, hydrate):
+    sizes, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        response = store.query(q, top_k=top_k, filter=SEARCH_FILTER, include_metadata=not hydrate.id_only)
+        payload = json.dumps(response)  # wire format
+        matches = json.loads(payload)["matches"]
+        hydrate(matches)
+        latencies.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(payload.encode("utf-8")))
+    return np.mean(sizes), np.mean(latencies), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--top-k", type=int, default=6, help="store top_k (retriever asks for 2 x top_k)")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        store, products, chunks = build(args, random.Random(0), path)
+        queries = np.random.default_rng(1).normal(size=(args.queries, args.dim)).astype(np.float32)
+
+        def full(matches):
+            return [ProductRetriever._item_from_metadata(m["id"], m["metadata"], m["score"]) for m in matches]
+        full.id_only = False
+
+        def id_only(matches):
+            # Same lookups as ProductRetriever.search: catalog index, then the local chunk copy
+            return [products.get(m["id"]) or dict(chunks[m["id"]], type="pdf_document", score=m["score"])
+                    for m in matches]
+        id_only.id_only = True
+
+        print(f"{args.products} products + {args.chunks} PDF chunks, top_k={args.top_k}")
+        print(f"{'mode':<12}{'bytes/query':>14}{'mean ms':>10}{'p95 ms':>10}")
+        for name, hydrate in (("metadata", full), ("id-only", id_only)):
+            size, mean, p95 = run(store, queries, args.top_k, hydrate)
+            print(f"{name:<12}{size:>14.0f}{mean:>10.3f}{p95:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
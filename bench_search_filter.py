@@ -0,0 +1,79 @@
+"""
+Microbenchmark - fuzzy post-filtering of search_products
+Per-item fuzz.partial_ratio loop (old) vs one process.cdist call (retrieval.postfilter)
+
+Usage:
+    python bench_search_filter.py
+    python bench_search_filter.py --sizes 10 100 1000 5000 --repeats 50
+"""
+import argparse
+import random
+import time
+
+from rapidfuzz import fuzz
+
+from catalog.schema import Product
+from retrieval.postfilter import fuzzy_filter
+
+WORDS = ["chemise", "blanche", "chaussures", "cuir", "homme", "baskets", "sport", "montre",
+         "élégante", "ceinture", "marron", "costume", "bleu", "polo", "jean", "noir", "veste",
+         "coton", "lin", "soie", "boubou", "brodé", "sandales", "casquette", "sac", "parfum"]
+
+
+def make_candidates(n, rng):
+    candidates = []
+    for i in range(n):
+        if i % 2 == 0:
+            candidates.append(Product(
+                id=f"P-{i}", name=" ".join(rng.choices(WORDS, k=4)).title(),
+                category=" ".join(rng.choices(WORDS, k=2)), description="",
+                price=10000, currency="XOF", in_stock=True,
+            ))
+        else:
+            text = " ".join(rng.choices(WORDS, k=160))[:1000]
+            candidates.append({"id": f"doc_chunk_{i}", "type": "pdf_document", "text": text})
+    return candidates
+
+
+def loop_filter(query, results):
+    """Previous implementation (one partial_ratio call per field and per item)."""
+    query_lower = query.lower()
+    products, pdf_matches = [], []
+    for item in results:
+        if hasattr(item, "name"):
+            if (fuzz.partial_ratio(query_lower, item.name.lower()) > 70 or
+                    fuzz.partial_ratio(query_lower, item.category.lower()) > 70):
+                products.append(item)
+        elif isinstance(item, dict):
+            text = item.get("text", "")
+            if query_lower in text.lower() or fuzz.partial_ratio(query_lower, text.lower()) > 75:
+                pdf_matches.append(item)
+    return products, pdf_matches
+
+
+def per_call_ms(fn, query, candidates, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(query, candidates)
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--query", default="chemise blanche en lin")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'candidates':>10}{'loop ms':>12}{'cdist ms':>12}{'speedup':>10}  same result")
+    for size in args.sizes:
+        candidates = make_candidates(size, rng)
+        same = loop_filter(args.query, candidates) == fuzzy_filter(args.query, candidates)
+        loop_ms = per_call_ms(loop_filter, args.query, candidates, args.repeats)
+        batch_ms = per_call_ms(fuzzy_filter, args.query, candidates, args.repeats)
+        print(f"{size:>10}{loop_ms:>12.3f}{batch_ms:>12.3f}{loop_ms / batch_ms:>10.1f}  {'✅' if same else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
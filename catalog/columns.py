@@ -0,0 +1,77 @@
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from catalog.schema import Product
+
+class ProductColumns:
+    """
+    Stockage colonne des champs filtrables d'une liste de produits.
+    price, stock_quantity, in_stock et le code de catégorie sont des tableaux NumPy
+    (stock_tracked distingue stock_quantity None, stock non suivi, de toute valeur réelle)
+    alignés sur products : les filtres disponibilité / prix / catégorie sont des
+    masques booléens calculés en une opération sur tout le catalogue.
+    """
+
+    def __init__(self, products: Sequence[Product]):
+        self.products = list(products)
+        self.ids = [str(p.id) for p in self.products]
+        self.rows = {pid: row for row, pid in enumerate(self.ids)}
+
+        self.categories = sorted({(p.category or "").lower() for p in self.products})
+        self._category_codes = {name: code for code, name in enumerate(self.categories)}
+
+        n = len(self.products)
+        self.price = np.fromiter((p.price or 0 for p in self.products), dtype=np.float64, count=n)
+        self.stock_tracked = np.fromiter((p.stock_quantity is not None for p in self.products), dtype=bool, count=n)
+        self.stock_quantity = np.fromiter(
+            (p.stock_quantity or 0 for p in self.products), dtype=np.int64, count=n,
+        )
+        self.in_stock = np.fromiter((bool(p.in_stock) for p in self.products), dtype=bool, count=n)
+        self.category = np.fromiter(
+            (self._category_codes[(p.category or "").lower()] for p in self.products),
+            dtype=np.int32, count=n,
+        )
+
+    def __len__(self):
+        return len(self.products)
+
+    def available_mask(self) -> np.ndarray:
+        """Même règle que validator.filter_available_products, vectorisée."""
+        return self.in_stock & (~self.stock_tracked | (self.stock_quantity > 0))
+
+    def price_mask(self, min_price: Optional[float] = None, max_price: Optional[float] = None) -> np.ndarray:
+        mask = np.ones(len(self.products), dtype=bool)
+        if min_price is not None:
+            mask &= self.price >= min_price
+        if max_price is not None:
+            mask &= self.price <= max_price
+        return mask
+
+    def category_mask(self, categories: Iterable[str]) -> np.ndarray:
+        codes = [self._category_codes[c.lower()] for c in categories if c and c.lower() in self._category_codes]
+        return np.isin(self.category, codes)
+
+    def mask(self, available: bool = True, min_price: Optional[float] = None,
+             max_price: Optional[float] = None, categories: Optional[Iterable[str]] = None) -> np.ndarray:
+        mask = self.price_mask(min_price, max_price)
+        if available:
+            mask &= self.available_mask()
+        if categories is not None:
+            mask &= self.category_mask(categories)
+        return mask
+
+    def rows_for(self, product_ids: Iterable[str]) -> np.ndarray:
+        """Lignes des ids connus (les ids absents du catalogue sont ignorés)."""
+        return np.fromiter((self.rows[pid] for pid in map(str, product_ids) if pid in self.rows), dtype=np.int64)
+
+    def take(self, mask_or_rows) -> List[Product]:
+        rows = np.flatnonzero(mask_or_rows) if mask_or_rows.dtype == bool else mask_or_rows
+        return [self.products[row] for row in rows]
+
+    def filter(self, **criteria) -> List[Product]:
+        return self.take(self.mask(**criteria))
+
+    def nbytes(self) -> int:
+        return (self.price.nbytes + self.stock_quantity.nbytes + self.stock_tracked.nbytes
+                + self.in_stock.nbytes + self.category.nbytes)
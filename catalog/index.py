@@ -0,0 +1,146 @@
+import hashlib
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from catalog.columns import ProductColumns
+from catalog.loader import CATALOG_PATH
+from catalog.schema import Product
+
+
+class _Snapshot:
+    """Vue immuable du catalogue à une version donnée (remplacée d'un bloc au rechargement)."""
+
+    def __init__(self, products: List[Product], digest: Optional[str]):
+        self.digest = digest
+        self.columns = ProductColumns(products)
+        self.ids = self.columns.ids
+        self.products: Dict[str, Product] = dict(zip(self.ids, products))
+        self.rows = self.columns.rows
+
+        self.by_category: Dict[str, List[str]] = {}
+        for pid, p in self.products.items():
+            self.by_category.setdefault((p.category or "").lower(), []).append(pid)
+
+        # Prix triés (bisect) et disponibilité par ligne
+        order = sorted(range(len(products)), key=lambda row: products[row].price or 0)
+        self.sorted_prices = [float(products[row].price or 0) for row in order]
+        self.sorted_price_ids = [self.ids[row] for row in order]
+        self.in_stock = self.columns.available_mask()
+
+
+class CatalogIndex:
+    """
+    Vue en mémoire de products/catalog.json : id -> Product, catégorie -> ids,
+    prix triés et bitmap de disponibilité.
+    Le fichier n'est relu que si son mtime / sa taille change, puis reparsé
+    seulement si son contenu (sha256) a changé ; la nouvelle vue remplace
+    l'ancienne d'un seul coup, les lecteurs ne voient jamais d'état partiel.
+    """
+
+    def __init__(self, path: Path = CATALOG_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._stat = None
+        self._snapshot = _Snapshot([], None)
+        self.reloads = 0
+
+    def _file_stat(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self) -> _Snapshot:
+        stat = self._file_stat()
+        if stat == self._stat:
+            return self._snapshot
+        with self._lock:
+            if stat == self._stat:
+                return self._snapshot
+            if stat is None:
+                self._snapshot = _Snapshot([], None)
+            else:
+                raw = self.path.read_bytes()
+                digest = hashlib.sha256(raw).hexdigest()
+                if digest != self._snapshot.digest:
+                    products = [Product(**item) for item in json.loads(raw.decode("utf-8"))]
+                    self._snapshot = _Snapshot(products, digest)
+                    self.reloads += 1
+            self._stat = stat
+            return self._snapshot
+
+    @property
+    def version(self) -> Optional[str]:
+        """sha256 du catalogue chargé (None si le fichier n'existe pas)."""
+        return self._refresh().digest
+
+    @property
+    def products(self) -> Dict[str, Product]:
+        return self._refresh().products
+
+    def __len__(self):
+        return len(self._refresh().ids)
+
+    def all(self) -> List[Product]:
+        return list(self._refresh().products.values())
+
+    def get(self, product_id) -> Optional[Product]:
+        return self._refresh().products.get(str(product_id))
+
+    def is_available(self, product_id) -> bool:
+        snapshot = self._refresh()
+        row = snapshot.rows.get(str(product_id))
+        return row is not None and bool(snapshot.in_stock[row])
+
+    def available(self) -> List[Product]:
+        snapshot = self._refresh()
+        return [snapshot.products[snapshot.ids[row]] for row in np.flatnonzero(snapshot.in_stock)]
+
+    def ids_in_category(self, category: str) -> List[str]:
+        return list(self._refresh().by_category.get((category or "").lower(), []))
+
+    def categories(self) -> List[str]:
+        return sorted(self._refresh().by_category)
+
+    def ids_in_price_range(self, min_price: float = None, max_price: float = None) -> List[str]:
+        snapshot = self._refresh()
+        start = bisect_left(snapshot.sorted_prices, min_price) if min_price is not None else 0
+        end = bisect_right(snapshot.sorted_prices, max_price) if max_price is not None else None
+        return snapshot.sorted_price_ids[start:end]
+
+    def filter(self, available: bool = True, min_price: float = None, max_price: float = None,
+               categories: List[str] = None) -> List[Product]:
+        """Produits du catalogue filtrés par masques vectorisés (disponibilité, prix, catégories)."""
+        return self._refresh().columns.filter(
+            available=available, min_price=min_price, max_price=max_price, categories=categories
+        )
+
+    def stats(self) -> dict:
+        snapshot = self._refresh()
+        return {
+            "products": len(snapshot.ids),
+            "available": int(snapshot.in_stock.sum()),
+            "categories": len(snapshot.by_category),
+            "reloads": self.reloads,
+            "version": snapshot.digest[:12] if snapshot.digest else None,
+        }
+
+
+_catalog_index = None
+_catalog_index_lock = threading.Lock()
+
+
+def get_catalog_index() -> CatalogIndex:
+    """Index partagé par le retriever, les outils et le panier."""
+    global _catalog_index
+    if _catalog_index is None:
+        with _catalog_index_lock:
+            if _catalog_index is None:
+                _catalog_index = CatalogIndex()
+    return _catalog_index
@@ -1,5 +1,6 @@
 
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,13 +14,95 @@ PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "shop-catalog")
 PINECONE_CLOUD = os.getenv("PINECONE_CLOUD", "aws")
 PINECONE_REGION = os.getenv("PINECONE_REGION", "us-east-1")
 
+# --- Vector store ---
+# "pinecone" (service distant) ou "local" (NumPy en mémoire, persisté sur disque)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")
+LOCAL_VECTOR_STORE_PATH = os.getenv(
+    "LOCAL_VECTOR_STORE_PATH",
+    str(Path(__file__).parent.parent / "data" / "vectorstore"),
+)
+# Index du store local : "exact" (force brute) ou "ivf" (approximatif, IVF-flat)
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "exact")
+ANN_NLIST = int(os.getenv("ANN_NLIST", "0"))  # 0 = auto (~4 * sqrt(n))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))  # rappel <-> latence
+ANN_MIN_VECTORS = int(os.getenv("ANN_MIN_VECTORS", "50000"))  # en dessous : exact
+
 # --- Embeddings ---
 EMBEDDING_MODEL_NAME = "intfloat/multilingual-e5-large"
 EMBEDDING_DIMENSION = 1024
 
+# Backend d'inférence CPU : "torch", "torch-int8", "onnx" ou "onnx-int8"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_QUANTIZATION_CONFIG = os.getenv("ONNX_QUANTIZATION_CONFIG", "avx2")  # arm64, avx2, avx512, avx512_vnni
+ONNX_EXPORT_DIR = os.getenv(
+    "ONNX_EXPORT_DIR",
+    str(Path(__file__).parent.parent / "data" / "onnx"),
+)
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+PDF_EMBEDDING_BATCH_SIZE = int(os.getenv("PDF_EMBEDDING_BATCH_SIZE", "16"))
+
+# Micro-batching des embeddings de requêtes concurrentes (workers gunicorn multi-threads)
+EMBEDDING_MICROBATCH_ENABLED = os.getenv("EMBEDDING_MICROBATCH_ENABLED", "false").lower() == "true"
+EMBEDDING_MICROBATCH_MAX_SIZE = int(os.getenv("EMBEDDING_MICROBATCH_MAX_SIZE", "16"))
+EMBEDDING_MICROBATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MICROBATCH_MAX_WAIT_MS", "5"))
+
+# Cache disque des embeddings de passages (catalogue + PDF)
+PASSAGE_EMBEDDING_CACHE_ENABLED = os.getenv("PASSAGE_EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+PASSAGE_EMBEDDING_CACHE_DIR = os.getenv(
+    "PASSAGE_EMBEDDING_CACHE_DIR",
+    str(Path(__file__).parent.parent / "data" / "embedding_cache"),
+)
+
+# Cache des embeddings de requêtes (LRU + TTL)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))
+
 # --- RAG ---
 TOP_K_RESULTS = 5
 
+# Tools de recherche d'un même tour LLM exécutés en parallèle (pool de threads borné)
+TOOL_EXECUTOR_WORKERS = int(os.getenv("TOOL_EXECUTOR_WORKERS", "4"))
+
+# Recherche spéculative : candidats du message utilisateur récupérés pendant le premier appel LLM,
+# réutilisés si la requête de search_products lui ressemble (token_set_ratio >= score)
+SPECULATIVE_RETRIEVAL_ENABLED = os.getenv("SPECULATIVE_RETRIEVAL_ENABLED", "false").lower() == "true"
+SPECULATIVE_MATCH_SCORE = float(os.getenv("SPECULATIVE_MATCH_SCORE", "80"))
+SPECULATIVE_EXECUTOR_WORKERS = int(os.getenv("SPECULATIVE_EXECUTOR_WORKERS", "4"))
+
+# Budget de tokens du prompt (system + tools + historique), borné par le contexte du modèle
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "4500"))
+PROMPT_COMPLETION_RESERVE = int(os.getenv("PROMPT_COMPLETION_RESERVE", "1024"))
+# Tokenizer HF utilisé pour compter (par défaut celui du modèle d'embedding, déjà en cache).
+# Ce n'est pas celui du LLM : le compte est une estimation, d'où la marge PROMPT_TOKEN_MARGIN
+# appliquée au contexte du modèle et le budget par défaut volontairement bas
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", EMBEDDING_MODEL_NAME)
+PROMPT_TOKEN_MARGIN = float(os.getenv("PROMPT_TOKEN_MARGIN", "0.8"))
+
+# Mémoire conversationnelle : messages récents gardés dans ce budget de tokens,
+# les plus anciens sont résumés en arrière-plan (résumé borné lui aussi)
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "2000"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+
+# Recherche hybride : BM25 (lexical) + vecteurs, fusion par rang réciproque
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Cache des résultats de recherche (invalidé dès que catalog.json / les PDF changent)
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "512"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "600"))
+
+# Cache sémantique devant store.query : réutilise la réponse d'une requête paraphrasée
+# (similarité cosinus des embeddings >= seuil ; avec e5 les requêtes sans rapport sont déjà vers 0.8)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", str(RETRIEVAL_CACHE_TTL)))
+
+# Requêtes vectorielles sans métadonnées : produits hydratés depuis le catalogue local,
+# texte des chunks PDF chargé seulement pour les résultats retenus
+VECTOR_QUERY_ID_ONLY = os.getenv("VECTOR_QUERY_ID_ONLY", "true").lower() == "true"
+
 # -- ADMIN KEY -- #
 
 ADMIN_SECRET_KEY = os.getenv("ADMIN_SECRET_KEY")
@@ -1,15 +1,56 @@
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import TOOL_EXECUTOR_WORKERS, SPECULATIVE_RETRIEVAL_ENABLED, SPECULATIVE_MATCH_SCORE
 from core.prompt import SYSTEM_PROMPT, SUGGESTION_PROMPT
 from core.memory import ConversationMemory
-from tools.search_products import search_products
+from core.metrics import Counters
+from core.intents import (
+    detect_intent, product_words, refers_to_shown_product, record_turn, CHOICE_REPLIES, GREETING_MESSAGE,
+    GREETING, REQUEST_CONTACT, ADD_TO_CART, PENDING_CHOICE, PRODUCT_FOLLOWUP,
+)
+from core.working_set import ProductWorkingSet
+from catalog.index import get_catalog_index
+from core.responses import render_tool_result, record_render, render_product_list, CONTACT_OPTIONS
+from core.speculation import SpeculativeSearch
+from tools.search_products import find_products, format_search_results
 from tools.search_product_image import search_product_image
 from tools.contact import request_contact
-from core.tools_schema import TOOLS
+from core.prompt_builder import build_prompt, select_tools
 #from core.llm_client import llm_client
 from core.llm_client import get_llm_client
 
 from tools.cart import add_product_to_cart
 
+# Pool partagé par toutes les conversations : borne le nombre de recherches simultanées
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_EXECUTOR_WORKERS, thread_name_prefix="tool")
+
+# Durée par tool et gain des tours multi-tools
+_tool_stats = Counters(tool_calls={}, tool_ms={}, parallel_turns=0, parallel_wall_ms=0.0, parallel_sum_ms=0.0)
+
+
+def _timed_tool(tool_name, fn, *args):
+    """(résultat, durée ms) de fn(*args), durée ajoutée aux stats du tool"""
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    _tool_stats.add(tool_calls={tool_name: 1}, tool_ms={tool_name: elapsed})
+    return result, elapsed
+
+
+def get_tool_stats() -> dict:
+    stats = _tool_stats.snapshot()
+    return {
+        "tools": {
+            name: {"calls": calls, "avg_ms": round(stats["tool_ms"][name] / calls, 1)}
+            for name, calls in stats["tool_calls"].items()
+        },
+        "parallel_turns": stats["parallel_turns"],
+        # Somme des durées des tools vs durée réelle des tours multi-tools
+        "parallel_sum_ms": round(stats["parallel_sum_ms"]),
+        "parallel_wall_ms": round(stats["parallel_wall_ms"]),
+    }
+
 
 class CommercialAgent:
     def __init__(self, state=None):
@@ -19,6 +60,13 @@ class CommercialAgent:
         self.current_product = None
         self.last_products_list = []
         self.last_suggestions = []
+        # Produits déjà montrés : résout "le deuxième", images et prix sans recherche vectorielle
+        self.working_set = ProductWorkingSet()
+        # Intention servie sans LLM pendant le tour courant (None = tour LLM)
+        self.route = None
+        # Recherche spéculative du tour courant (SPECULATIVE_RETRIEVAL_ENABLED)
+        self.speculation = None
+        self.searched = False
 
     def resolve_pending_choice(self, choice: str):
         """Handle user's choice when a pending decision exists"""
@@ -27,21 +75,42 @@ class CommercialAgent:
         if not pending:
             return {"type": "text", "message": "Aucun choix en attente."}
         
-        options = pending.get("options", {})
+        options = pending.get("options") or (pending.get("payload") or {}).get("options", {})
+        # oui / non ne valent 1 / 2 que pour une question à deux options
+        reply = choice.lower()
+        choice = CHOICE_REPLIES.get(reply, choice) if reply not in ("oui", "non") or len(options) == 2 else reply
         if choice not in options:
-            return {"type": "text", "message": "Merci de répondre par 1 ou 2."}
+            numbers = sorted(options)
+            return {"type": "text", "message": f"Merci de répondre par {', '.join(numbers[:-1])} ou {numbers[-1]}."}
 
         action = options[choice]
         self.state.pending_choice = None
 
         if action == "ADD_TO_CART":
             if self.current_product:
-                return {"type": "add_to_cart", "product": self.current_product}
+                return self.add_to_cart(self.current_product)
             else:
                 return {"type": "text", "message": "❌ Produit introuvable."}
 
         if action == "SEE_MORE":
-            return {"type": "text", "message": "Voici d'autres produits similaires 👇"}
+            return self.see_more(self.current_product)
+
+        if action == "SHOW_IMAGE":
+            if not self.current_product:
+                return {"type": "text", "message": "❌ Produit introuvable."}
+            result = search_product_image(self.current_product.get('name', ''), working_set=self.working_set)
+            if isinstance(result, dict) and result.get("id"):
+                self.current_product = result
+            return self.render_tool_turn([render_tool_result("search_product_image", result)], 1)
+
+        if action == "REQUEST_CONTACT":
+            self.memory.add("assistant", request_contact())
+            return {"type": "request_contact"}
+
+        if action == "CONTINUE":
+            answer = "D'accord ! Que souhaitez-vous voir d'autre ?"
+            self.memory.add("assistant", answer)
+            return {"type": "text", "message": answer}
 
         return {"type": "text", "message": "Action non reconnue."}
 
@@ -197,7 +266,206 @@ class CommercialAgent:
         
         return user_input
 
+    @staticmethod
+    def live_product(product: dict) -> dict:
+        """Prix et stock à jour depuis l'index catalogue (le working set peut dater)"""
+        live = get_catalog_index().get(product.get('id'))
+        if live is None:
+            return product
+        return {**product, 'price': live.price, 'currency': live.currency,
+                'in_stock': live.in_stock, 'stock_quantity': live.stock_quantity}
+
+    def answer_product_followup(self, user_input: str):
+        """Answer price/stock questions about an already shown product, without LLM or search"""
+        text = user_input.lower()
+        asks_price = any(k in text for k in ['prix', 'combien', 'coûte', 'coute', 'tarif'])
+        asks_stock = any(k in text for k in ['stock', 'disponible', 'dispo', 'reste'])
+        if not (asks_price or asks_stock) or not len(self.working_set):
+            return None
+
+        product = self.working_set.resolve(user_input)
+        # Sans produit nommé, seulement si la question renvoie au produit affiché ("il coûte combien ?")
+        if product is None and self.current_product and refers_to_shown_product(user_input):
+            product = self.current_product
+        if product is None:
+            return None
+
+        product = self.live_product(product)
+        lines = [f"**{product.get('name')}**"]
+        if asks_price and product.get('price') is not None:
+            lines.append(f"Prix : {product['price']} {product.get('currency') or ''}".strip())
+        if asks_stock:
+            if product.get('in_stock') and (product.get('stock_quantity') or 0) > 0:
+                lines.append(f"✅ En stock ({product['stock_quantity']} disponible(s))")
+            elif product.get('in_stock'):
+                lines.append("✅ En stock")
+            else:
+                lines.append("❌ Actuellement en rupture de stock")
+        lines.append("\nSouhaitez-vous voir l'image ou l'ajouter au panier ?")
+
+        self.current_product = product
+        return "\n".join(lines)
+
+    def see_more(self, product):
+        """Autres produits de la même catégorie que le produit refusé, sinon demande quoi chercher"""
+        get = product.get if isinstance(product, dict) else (lambda k, d=None: getattr(product, k, d))
+        query = (get('category') or get('name') or '') if product else ''
+        products = []
+        if query:
+            products, _ = find_products(query)
+            products = [p for p in products if str(p.id) != str(get('id'))]
+
+        if not products:
+            answer = "D'accord ! Quel type d'article souhaitez-vous voir à la place ?"
+            self.memory.add("assistant", answer)
+            return {"type": "text", "message": answer}
+
+        self.working_set.add(products)
+        self.current_product = None
+        self.last_products_list = [
+            self.working_set.by_id[pid] for pid in self.working_set.last_shown
+            if pid in self.working_set.by_id
+        ]
+        answer = render_product_list(products)
+        self.memory.add("assistant", answer)
+        self.last_suggestions = self.extract_suggestions_from_text(answer)
+        return {"type": "text", "message": answer}
+
+    def add_to_cart(self, product):
+        """Ajout au panier via le tool déterministe, puis question fixe sur le contact commercial"""
+        product = self.live_product(product)
+        result = add_product_to_cart(product)
+        if not result["success"]:
+            self.memory.add("assistant", result["error"])
+            return {"type": "text", "message": result["error"]}
+
+        self.current_product = None
+        # La question est affichée avec la confirmation : le choix en attente correspond à ce que voit l'utilisateur
+        answer = (f"{result['message']}\n\n{result['contact_question']}\n\n"
+                  "1️⃣ Oui, donnez-moi le numéro\n"
+                  "2️⃣ Non, je continue mes achats")
+        self.memory.add("assistant", answer)
+        if self.state is not None:
+            self.state.set_pending_choice(
+                choice_type="POST_CART_CONTACT",
+                payload={"options": CONTACT_OPTIONS}
+            )
+        return {"type": "add_to_cart", "product": dict(product), "message": answer,
+                "pending_choice": self.state.pending_choice if self.state is not None else None}
+
+    def route_intent(self, user_input: str):
+        """
+        Pre-LLM router: greeting, contact request, add-to-cart and pending 1/2 replies
+        are answered from templates and deterministic tools. None = let the LLM handle it.
+        """
+        pending = bool(self.state is not None and self.state.pending_choice)
+        intent = detect_intent(user_input, pending_choice=pending)
+
+        if intent == PENDING_CHOICE:
+            self.route = intent
+            return self.resolve_pending_choice(user_input.strip(" .!"))
+
+        if intent == GREETING:
+            self.route = intent
+            self.memory.add("assistant", GREETING_MESSAGE)
+            return {"type": "text", "message": GREETING_MESSAGE}
+
+        if intent == REQUEST_CONTACT:
+            self.route = intent
+            self.memory.add("assistant", request_contact())
+            return {"type": "request_contact"}
+
+        if intent == ADD_TO_CART:
+            product = self.working_set.resolve(user_input) if len(self.working_set) else None
+            # Produit courant seulement sans autre nom d'article ("je le prends", "ajouter au panier")
+            if product is None and not product_words(user_input):
+                product = self.current_product
+            if product is None:
+                return None
+            self.route = intent
+            return self.add_to_cart(product)
+
+        return None
+
+    def _search_products_tool(self, args):
+        query = args.get("query", "")
+        self.searched = True
+        # Candidats déjà récupérés pendant le premier appel LLM si la requête ressemble au message
+        prefetched = self.speculation.take(query) if self.speculation is not None else None
+        return find_products(query, results=prefetched)
+
+    def run_retrieval_tools(self, calls) -> dict:
+        """
+        Exécute les tools de recherche du tour ({call.id: résultat}).
+        Plusieurs appels partent en parallèle sur le pool borné : le tour coûte
+        max(tool) au lieu de sum(tool). Les effets (working set, produit courant)
+        sont appliqués ensuite par l'appelant, dans l'ordre des tool_calls.
+        """
+        retrieval = {
+            "search_products": self._search_products_tool,
+            "search_product_image": lambda args: search_product_image(
+                args.get("query", ""), working_set=self.working_set
+            ),
+        }
+        jobs = [(call.id, name, args) for call, name, args in calls if name in retrieval]
+        if len(jobs) <= 1:
+            return {cid: _timed_tool(name, retrieval[name], args)[0] for cid, name, args in jobs}
+
+        start = time.perf_counter()
+        futures = [(cid, _tool_executor.submit(_timed_tool, name, retrieval[name], args)) for cid, name, args in jobs]
+        outputs, durations = {}, []
+        for cid, future in futures:
+            outputs[cid], elapsed = future.result()
+            durations.append(elapsed)
+        _tool_stats.add(parallel_turns=1, parallel_wall_ms=(time.perf_counter() - start) * 1000,
+                        parallel_sum_ms=sum(durations))
+        return outputs
+
+    def render_tool_turn(self, renderings, n_calls: int):
+        """Réponse finale depuis les templates si chaque tool du tour en a un, sinon None"""
+        if not renderings or len(renderings) != n_calls or any(r is None for r in renderings):
+            return None
+        if len(renderings) > 1:
+            # Textes (liste, contact) concaténés ; une image ne se combine pas
+            if any(r["type"] not in ("text", "request_contact") for r in renderings):
+                return None
+            renderings = [{"type": "text", "message": "\n\n".join(r["message"] for r in renderings),
+                           "pending_options": renderings[-1].get("pending_options")}]
+
+        response = dict(renderings[0])
+        pending_options = response.pop("pending_options", None)
+        self.memory.add("assistant", response["message"])
+        self.last_suggestions = self.extract_suggestions_from_text(response["message"])
+        if self.state is not None:
+            # Les options affichées remplacent tout choix précédent, même quand elles n'ont pas de mapping
+            if pending_options:
+                self.state.set_pending_choice(choice_type="POST_TOOL_CHOICE", payload={"options": pending_options})
+            else:
+                self.state.pending_choice = None
+        if response["type"] in ("text", "product_image"):
+            response["pending_choice"] = self.state.pending_choice if self.state is not None else None
+        return response
+
     def run(self, user_input: str):
+        start = time.perf_counter()
+        self.route = None
+        self.speculation = None
+        self.searched = False
+        try:
+            response = self._run(user_input)
+        finally:
+            if self.speculation is not None:
+                self.speculation.finish(searched=self.searched)
+        record_turn(self.route, (time.perf_counter() - start) * 1000)
+        return response
+
+    def _run(self, user_input: str):
+        # Reply to a pending 1/2 choice: resolved locally
+        pending = self.state is not None and self.state.pending_choice
+        if pending and detect_intent(user_input, pending_choice=True) == PENDING_CHOICE:
+            self.memory.add("user", user_input)
+            return self.route_intent(user_input)
+
         # Check if this is a clarification response
         if self.last_suggestions and user_input.strip() in ['1', '2', '3', '1️⃣', '2️⃣', '3️⃣']:
             user_input = self.handle_numbered_response(user_input)
@@ -214,23 +482,46 @@ class CommercialAgent:
         # Add user message to memory
         self.memory.add("user", user_input)
 
-        # Build messages for LLM
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-        messages += self.memory.get()
-        messages.append({"role": "user", "content": user_input})
+        # Deterministic intents (greeting, contact, cart): no LLM call
+        routed = self.route_intent(user_input)
+        if routed is not None:
+            return routed
 
-        # Pending choice handling
+        # Price / stock follow-up on a product already shown in this conversation
+        followup = self.answer_product_followup(user_input)
+        if followup:
+            self.route = PRODUCT_FOLLOWUP
+            self.memory.add("assistant", followup)
+            self.last_suggestions = self.extract_suggestions_from_text(followup)
+            return {"type": "text", "message": followup}
+
+        # Build messages for LLM (memory already ends with user_input)
+        llm = get_llm_client()
+        system_notes = []
         if self.state.pending_choice:
-            messages.insert(1, {
-                "role": "system",
-                "content": "Un choix est en attente. L'utilisateur doit répondre par un numéro (1 ou 2). Tu DOIS appeler le tool `handle_pending`."
-            })
+            system_notes.append(
+                "Un choix est en attente. L'utilisateur doit répondre par un numéro (1 ou 2). "
+                "Tu DOIS appeler le tool `handle_pending_choice`."
+            )
+        messages, tools = build_prompt(
+            SYSTEM_PROMPT,
+            self.memory.get(),
+            system_notes=system_notes,
+            tools=select_tools(
+                has_products=bool(len(self.working_set) or self.current_product),
+                pending_choice=bool(self.state.pending_choice),
+            ),
+            model=getattr(llm, "model", None),
+        )
+
+        # Opt-in: retrieval of the user message overlaps the first LLM call
+        if SPECULATIVE_RETRIEVAL_ENABLED:
+            self.speculation = SpeculativeSearch(user_input, SPECULATIVE_MATCH_SCORE)
 
         # First LLM call
-        llm = get_llm_client()
         response = llm.chat_complete(
             messages=messages,
-            tools=TOOLS,
+            tools=tools,
             tool_choice="auto",
             temperature=0.3
         )
@@ -248,50 +539,61 @@ class CommercialAgent:
         # Handle tool_calls
         messages.append({"role": "assistant", "tool_calls": message.tool_calls})
         cart_action = None
+        renderings = []
 
+        calls = []
         for call in message.tool_calls:
-            tool_name = call.function.name
-            raw_args = call.function.arguments or "{}"
-
             try:
-                args = json.loads(raw_args)
+                args = json.loads(call.function.arguments or "{}")
             except json.JSONDecodeError:
                 args = {}
+            calls.append((call, call.function.name, args))
 
+        # Retrieval tools run concurrently; results are applied below in tool_calls order
+        outputs = self.run_retrieval_tools(calls)
+
+        for call, tool_name, args in calls:
             result = None
 
             if tool_name == "search_products":
-                result = search_products(args.get("query", ""))
-                self.current_product = None
-                if isinstance(result, list):
-                    self.last_products_list = result
-                elif isinstance(result, dict) and 'products' in result:
-                    self.last_products_list = result['products']
+                query = args.get("query", "")
+                products, pdf_matches = outputs[call.id]
+                if products:
+                    self.working_set.add(products)
+                result = format_search_results(query, products, pdf_matches)
+                renderings.append(render_tool_result(tool_name, result, products, pdf_matches))
+                self.last_products_list = [
+                    self.working_set.by_id[pid] for pid in self.working_set.last_shown
+                    if pid in self.working_set.by_id
+                ]
+                # Un seul produit listé : c'est lui que visent "voir l'image" / "ajouter au panier"
+                self.current_product = self.last_products_list[0] if len(products) == 1 and self.last_products_list else None
 
             elif tool_name == "search_product_image":
-                result = search_product_image(args.get("query", ""))
+                result = outputs[call.id]
+                renderings.append(render_tool_result(tool_name, result))
                 if isinstance(result, dict) and result.get("id"):
                     self.current_product = result
                     self.last_products_list = []
 
             elif tool_name == "request_contact":
                 result = request_contact()
+                renderings.append(render_tool_result(tool_name, result))
 
             elif tool_name == "add_product_to_cart":
+                if not self.current_product:
+                    # "je prends le deuxième" : produit désigné dans la liste déjà affichée
+                    self.current_product = (
+                        self.working_set.by_id.get(str(args.get("product_id", "")))
+                        or self.working_set.resolve(user_input)
+                    )
                 if self.current_product:
-                    cart_action = {
-                        "type": "add_to_cart",
-                        "product": self.current_product.copy()
-                    }
-                    result = {
-                        "success": True,
-                        "message": f"Produit {self.current_product.get('name', '')} prêt à être ajouté au panier"
-                    }
-                    self.current_product = None
+                    cart_action = self.add_to_cart(self.current_product)
+                    result = {"success": cart_action["type"] == "add_to_cart"}
                 else:
                     result = {"error": "Aucun produit sélectionné. Veuillez d'abord choisir un produit spécifique."}
 
-            elif tool_name == "handle_pending":
+            elif tool_name in ("handle_pending", "handle_pending_choice"):
                 choice = args.get("choice", "").strip()
                 return self.resolve_pending_choice(choice)
 
@@ -308,6 +610,12 @@ class CommercialAgent:
         if cart_action:
             return cart_action
 
+        # Deterministic tool results: templated reply, no second LLM call
+        rendered = self.render_tool_turn(renderings, len(message.tool_calls))
+        record_render([call.function.name for call in message.tool_calls], rendered is not None)
+        if rendered is not None:
+            return rendered
+
         # Second LLM call
         final_response = llm.chat_complete(
             messages=messages,
@@ -1,13 +1,130 @@
-
 # core/intents.py
+import re
+
+from core.metrics import Counters
+from retrieval.normalize import strip_accents
+
+ADD_TO_CART = "ADD_TO_CART"
+SEE_MORE = "SEE_MORE"
+GREETING = "GREETING"
+REQUEST_CONTACT = "REQUEST_CONTACT"
+PENDING_CHOICE = "PENDING_CHOICE"
+PRODUCT_FOLLOWUP = "PRODUCT_FOLLOWUP"
+UNKNOWN = "UNKNOWN"
+
+# Réponse fixe imposée par SYSTEM_PROMPT (section SALUTATION)
+GREETING_MESSAGE = (
+    "Bienvenue sur SmartShop, votre guide d'achat de vêtements et accessoires de mode pour hommes.\n"
+    "Que désirez-vous acheter aujourd'hui ?"
+)
+
+GREETING_WORDS = {"bonjour", "bonsoir", "salut", "hello", "hey", "coucou", "bjr", "slt", "hi", "salam"}
+CHOICE_REPLIES = {"1": "1", "1️⃣": "1", "2": "2", "2️⃣": "2", "3": "3", "3️⃣": "3", "oui": "1", "non": "2"}
+
+# Phrases de demande de contact (déclencheurs de SYSTEM_PROMPT) : "commercial" seul peut
+# décrire un produit ("chemise pour un commercial"), il doit suivre "parler à", "contacter"...
+_CONTACT_TARGET = r"(un |une |l'|le |la |votre |vos |des )?(agent|conseiller|conseillere|commercial|commerciale|vendeur|humain|quelqu'un|quelquun)"
+_CONTACT_RE = re.compile(
+    r"\b(contacter|joindre|appeler|parler (a|avec)) " + _CONTACT_TARGET
+    + r"|\b(contacter|joindre)( vous| un| svp)?\s*[?!.]*$"
+    + r"|\b(numero|telephone|contact) (d'un |de l'|du |de votre )?(agent|conseiller|commercial|vendeur)"
+    + r"|\bbesoin d'aide\b|\bservice client\b"
+)
+_CART_RE = re.compile(
+    r"\b(ajoute[rz]?|mets|mettre|met)\b.*\bpanier\b"
+    r"|\bje (le |la |les )?prends\b|\bj'achete\b"
+)
+
+# Mots d'une demande qui ne désignent pas un article : ce qui reste est un nom de produit
+# ("ajoute les baskets noires" -> baskets, noires)
+_NON_PRODUCT_WORDS = {
+    "le", "la", "les", "l", "un", "une", "des", "du", "de", "d", "au", "aux", "en", "dans", "a",
+    "mon", "ma", "mes", "ce", "cet", "cette", "ces", "ca", "c", "celui", "celle", "ci",
+    "il", "elle", "ils", "elles", "je", "j", "moi", "me", "m", "vous", "nous", "on", "y",
+    "est", "sont", "s", "qu", "que", "quel", "quelle", "n", "pas", "plus", "encore", "aussi", "bien",
+    "produit", "article", "modele", "panier",
+    "ajoute", "ajouter", "ajoutez", "ajoutes", "mets", "mettre", "met", "mettez",
+    "prends", "prend", "prendre", "achete", "acheter", "veux", "voudrais", "souhaite",
+    "coute", "coutent", "combien", "prix", "tarif", "reste", "stock", "dispo", "disponible",
+    "svp", "stp", "plait", "merci", "oui", "ok", "alors", "et",
+}
+_REFERENCE_RE = re.compile(
+    r"\b(ce|cet|cette) (produit|article|modele)\b|^(et )?(il|elle|ils|elles|ca|c'est|celui-ci|celle-ci)\b"
+)
+
+
+def _plain(text: str) -> str:
+    return strip_accents(text.lower()).replace("’", "'").strip()
+
+
+def detect_intent(user_input: str, pending_choice: bool = False) -> str:
+    """
+    Intention reconnue sans LLM (règles déterministes), sinon UNKNOWN.
+    Ne reconnaît que des messages courts et sans ambiguïté : tout le reste passe par le LLM.
+    """
+    text = _plain(user_input)
+    if not text:
+        return UNKNOWN
+
+    if pending_choice and text.strip(" .!") in CHOICE_REPLIES:
+        return PENDING_CHOICE
+
+    words = re.findall(r"[\w']+", text)
+    if words and len(words) <= 4 and all(w in GREETING_WORDS for w in words):
+        return GREETING
+
+    if len(words) <= 12 and _CONTACT_RE.search(text):
+        return REQUEST_CONTACT
+
+    if len(words) <= 12 and _CART_RE.search(text):
+        return ADD_TO_CART
+
+    return UNKNOWN
+
+
+def product_words(user_input: str) -> list:
+    """Mots du message qui peuvent nommer un article (hors verbes, articles, prix / stock...)."""
+    return [w for w in re.findall(r"\w+", _plain(user_input))
+            if w not in _NON_PRODUCT_WORDS and not w.isdigit()]
+
+
+def refers_to_shown_product(user_input: str) -> bool:
+    """
+    Question courte qui renvoie explicitement au produit affiché : "ce produit est dispo ?",
+    "il coûte combien ?". Faux dès qu'un autre nom d'article apparaît ("le prix des baskets ?").
+    """
+    text = _plain(user_input)
+    return (len(text.split()) <= 8 and bool(_REFERENCE_RE.search(text))
+            and not product_words(user_input))
+
+
+# Tours servis sans LLM
+_stats = Counters(turns=0, llm_turns=0, llm_ms=0.0, routed_ms=0.0, routed={})
+
+
+def record_turn(intent, elapsed_ms: float):
+    """intent=None : tour traité par le LLM."""
+    if intent is None:
+        _stats.add(turns=1, llm_turns=1, llm_ms=elapsed_ms)
+    else:
+        _stats.add(turns=1, routed={intent: 1}, routed_ms=elapsed_ms)
 
-ADD_TO_CART = ["ajouter", "prendre", "acheter", "1"]
-SEE_MORE = ["voir", "autres", "similaires", "2"]
 
-def detect_intent(user_input: str):
-    text = user_input.lower()
-    if any(k in text for k in ADD_TO_CART):
-        return "ADD_TO_CART"
-    if any(k in text for k in SEE_MORE):
-        return "SEE_MORE"
-    return "UNKNOWN"
+def get_router_stats() -> dict:
+    stats = _stats.snapshot()
+    routed = sum(stats["routed"].values())
+    llm_avg = stats["llm_ms"] / stats["llm_turns"] if stats["llm_turns"] else None
+    routed_avg = stats["routed_ms"] / routed if routed else None
+    return {
+        "turns": stats["turns"],
+        "llm_turns": stats["llm_turns"],
+        "routed_turns": routed,
+        "routed_by_intent": stats["routed"],
+        "llm_skip_rate": round(routed / stats["turns"], 3) if stats["turns"] else 0.0,
+        "avg_llm_turn_ms": round(llm_avg, 1) if llm_avg is not None else None,
+        "avg_routed_turn_ms": round(routed_avg, 1) if routed_avg is not None else None,
+        # Estimation : chaque tour routé aurait coûté un tour LLM moyen
+        "estimated_ms_saved": (
+            round(routed * (llm_avg - routed_avg)) if llm_avg is not None and routed_avg is not None else None
+        ),
+    }
@@ -1,16 +1,50 @@
 
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 
+from config.settings import MEMORY_TOKEN_BUDGET, MEMORY_SUMMARY_TOKENS
+from core.prompt_builder import count_tokens, message_tokens
+
+# Un seul thread pour toutes les conversations : le résumé ne passe jamais sur le chemin de la requête
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+
+SUMMARY_LINE_CHARS = 120
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+
+
+def _summarize_message(message: Dict[str, str]) -> str:
+    """Une ligne de résumé extractive (sans LLM) pour un message sorti de la fenêtre."""
+    content = " ".join((message.get("content") or "").split())
+    if message["role"] == "assistant":
+        names = _BOLD_RE.findall(content)
+        if names:
+            return "Produits montrés : " + ", ".join(dict.fromkeys(names))
+        return "Assistant : " + content[:SUMMARY_LINE_CHARS]
+    return "Client : " + content[:SUMMARY_LINE_CHARS]
+
+
 class ConversationMemory:
     """
-    Mémoire conversationnelle bufferisée pour un assistant.
-    Permet de stocker les échanges et de limiter le nombre de messages
-    pour optimiser les performances.
+    Mémoire conversationnelle bornée en tokens pour un assistant.
+    Les messages récents sont gardés tels quels (deque) tant qu'ils tiennent dans
+    token_budget ; les plus anciens sortent de la fenêtre et sont repliés en
+    arrière-plan dans un résumé court, lui-même borné à summary_tokens.
     """
 
-    def __init__(self, buffer_limit: int = 10):
-        self.buffer_limit = buffer_limit
-        self.memory: List[Dict[str, str]] = []
+    def __init__(self, token_budget: int = MEMORY_TOKEN_BUDGET, summary_tokens: int = MEMORY_SUMMARY_TOKENS):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self._lock = threading.Lock()
+        self.memory = deque()
+        self.tokens = 0
+        self._evicted = []
+        self._folding = False
+        self._summary_lines = deque()
+        self._summary_tokens = 0
+        self.folded_messages = 0
 
     def add(self, role: str, content: str):
         """
@@ -18,24 +52,72 @@ class ConversationMemory:
         role: "user" ou "assistant"
         content: texte du message
         """
-        self.memory.append({"role": role, "content": content})
-        # Limiter la mémoire pour ne conserver que les derniers buffer_limit messages
-        if len(self.memory) > self.buffer_limit:
-            self.memory = self.memory[-self.buffer_limit:]
+        message = {"role": role, "content": content}
+        with self._lock:
+            self.memory.append(message)
+            self.tokens += message_tokens(message)
+            # Le dernier message est toujours gardé, même s'il dépasse seul le budget
+            while self.tokens > self.token_budget and len(self.memory) > 1:
+                old = self.memory.popleft()
+                self.tokens -= message_tokens(old)
+                self._evicted.append(old)
+            if self._evicted and not self._folding:
+                self._folding = True
+                _summary_executor.submit(self._fold)
+
+    def _fold(self):
+        """Replie les messages sortis de la fenêtre dans le résumé (thread de fond)."""
+        while True:
+            with self._lock:
+                evicted, self._evicted = self._evicted, []
+                if not evicted:
+                    self._folding = False
+                    return
+            lines = [_summarize_message(m) for m in evicted]
+            with self._lock:
+                for line in lines:
+                    self._summary_lines.append(line)
+                    self._summary_tokens += count_tokens(line)
+                while self._summary_tokens > self.summary_tokens and len(self._summary_lines) > 1:
+                    self._summary_tokens -= count_tokens(self._summary_lines.popleft())
+                self.folded_messages += len(evicted)
+
+    @property
+    def summary(self) -> str:
+        with self._lock:
+            return "\n".join(self._summary_lines)
 
     def get(self) -> List[Dict[str, str]]:
         """
-        Retourne la liste des messages mémorisés pour le LLM.
-        Limité aux derniers messages pour les performances.
+        Retourne les messages pour le LLM : le résumé des échanges plus anciens
+        (message system) puis les messages récents, le tout dans le budget de tokens.
         """
-        return self.memory.copy()
+        with self._lock:
+            messages = list(self.memory)
+            summary = "\n".join(self._summary_lines)
+        if summary:
+            messages.insert(0, {"role": "system", "content": f"Résumé de la conversation précédente :\n{summary}"})
+        return messages
 
     def get_last_assistant(self) -> str:
         """
         Retourne le dernier message de l'assistant pour fournir un contexte.
         Si aucun message assistant n'existe, retourne une chaîne vide.
         """
-        for msg in reversed(self.memory):
-            if msg["role"] == "assistant":
-                return msg["content"]
+        with self._lock:
+            for msg in reversed(self.memory):
+                if msg["role"] == "assistant":
+                    return msg["content"]
         return ""
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "messages": len(self.memory),
+                "tokens": self.tokens,
+                "token_budget": self.token_budget,
+                "summary_lines": len(self._summary_lines),
+                "summary_tokens": self._summary_tokens,
+                "folded_messages": self.folded_messages,
+                "pending_fold": len(self._evicted),
+            }
@@ -0,0 +1,31 @@
+# core/metrics.py
+import threading
+
+
+class Counters:
+    """
+    Compteurs agrégés sur toutes les conversations (exposés par /api/metrics via
+    les get_*_stats() de chaque module). Une valeur est un nombre ou un dict
+    {nom: nombre} (par intent, par tool...) ; add() met à jour plusieurs compteurs
+    d'un coup sous le même verrou.
+    """
+
+    def __init__(self, **initial):
+        self._lock = threading.Lock()
+        self._values = initial
+
+    def add(self, **deltas):
+        """add(turns=1, routed={"greeting": 1}) : les dicts sont fusionnés clé par clé."""
+        with self._lock:
+            for key, delta in deltas.items():
+                if isinstance(delta, dict):
+                    group = self._values[key]
+                    for name, value in delta.items():
+                        group[name] = group.get(name, 0) + value
+                else:
+                    self._values[key] += delta
+
+    def snapshot(self) -> dict:
+        """Copie cohérente des compteurs, à lire hors verrou."""
+        with self._lock:
+            return {key: dict(value) if isinstance(value, dict) else value for key, value in self._values.items()}
@@ -0,0 +1,148 @@
+# core/prompt_builder.py
+import json
+import threading
+from functools import lru_cache
+
+from config.settings import PROMPT_TOKEN_BUDGET, PROMPT_COMPLETION_RESERVE, PROMPT_TOKENIZER, PROMPT_TOKEN_MARGIN
+from core.metrics import Counters
+from core.tools_schema import TOOLS
+
+# Fenêtre de contexte par modèle, en tokens du modèle. Les comptes ci-dessous viennent de
+# PROMPT_TOKENIZER (pas du tokenizer du LLM) : ce sont des estimations, d'où la marge
+# budget effectif = min(PROMPT_TOKEN_BUDGET, (contexte - réserve) * PROMPT_TOKEN_MARGIN)
+MODEL_CONTEXT_TOKENS = {
+    "mistral-tiny": 32000,
+    "open-mistral-7b": 32000,
+    "mistral-small-latest": 32000,
+    "mistral-large-latest": 128000,
+    "llama-3.1-8b-instant": 128000,
+    "llama-3.1-70b-versatile": 128000,
+    "llama-3.3-70b-versatile": 128000,
+    "mixtral-8x7b-32768": 32768,
+    "meta-llama/Llama-3.2-3B-Instruct": 8192,
+    "meta-llama/Llama-3.1-8B-Instruct": 8192,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+MESSAGE_OVERHEAD_TOKENS = 4  # rôle + séparateurs du chat template
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def _get_tokenizer():
+    """Tokenizer HF (tokenizers) ; False si indisponible -> estimation 4 caractères / token."""
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                try:
+                    from tokenizers import Tokenizer
+                    _tokenizer = Tokenizer.from_pretrained(PROMPT_TOKENIZER)
+                except Exception as e:
+                    print(f"⚠️  Prompt tokenizer unavailable ({e}), using a 4 chars/token estimate")
+                    _tokenizer = False
+    return _tokenizer
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Estimation (tokenizer PROMPT_TOKENIZER ou 4 caractères / token), pas le compte exact du LLM."""
+    if not text:
+        return 0
+    tokenizer = _get_tokenizer()
+    if tokenizer:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return max(1, len(text) // 4)
+
+
+def message_tokens(message: dict) -> int:
+    content = message.get("content") or ""
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def tools_tokens(tools) -> int:
+    return count_tokens(json.dumps(tools, ensure_ascii=False, sort_keys=True)) if tools else 0
+
+
+def token_budget(model: str = None) -> int:
+    context = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+    return min(PROMPT_TOKEN_BUDGET, int((context - PROMPT_COMPLETION_RESERVE) * PROMPT_TOKEN_MARGIN))
+
+
+def select_tools(has_products: bool, pending_choice: bool, tools=TOOLS) -> list:
+    """
+    Schémas utiles dans l'état de la conversation : le panier seulement si un produit
+    a déjà été montré, handle_pending_choice seulement si un choix est en attente.
+    """
+    selected = []
+    for tool in tools:
+        name = tool["function"]["name"]
+        if name == "add_product_to_cart" and not has_products:
+            continue
+        if name == "handle_pending_choice" and not pending_choice:
+            continue
+        selected.append(tool)
+    return selected
+
+
+def _dedupe(history):
+    """Supprime les répétitions consécutives d'un même message (même rôle, même contenu)."""
+    result = []
+    for message in history:
+        if result and result[-1]["role"] == message["role"] and result[-1]["content"] == message["content"]:
+            continue
+        result.append(message)
+    return result
+
+
+# Tokens par appel avant / après
+_stats = Counters(prompts=0, naive_tokens=0, built_tokens=0, history_dropped=0)
+
+
+def get_prompt_stats() -> dict:
+    stats = _stats.snapshot()
+    n = stats["prompts"]
+    return {
+        "prompts": n,
+        "avg_tokens_before": round(stats["naive_tokens"] / n) if n else None,
+        "avg_tokens_after": round(stats["built_tokens"] / n) if n else None,
+        "history_messages_dropped": stats["history_dropped"],
+    }
+
+
+def build_prompt(system_prompt: str, history, system_notes=(), tools=None, model: str = None):
+    """
+    Assemble (messages, tools) pour chat_complete dans le budget de tokens du modèle.
+    history se termine par le message utilisateur courant (il n'est pas ajouté une
+    seconde fois) ; les messages les plus anciens sont retirés en premier.
+    Le log compare avec l'ancien assemblage : tout l'historique, le tour courant
+    en double et tous les schémas de tools.
+    """
+    history = list(history)
+    system = [{"role": "system", "content": system_prompt}]
+    system += [{"role": "system", "content": note} for note in system_notes]
+    naive_tokens = (sum(message_tokens(m) for m in system + history) + tools_tokens(TOOLS)
+                    + (message_tokens(history[-1]) if history else 0))
+    history = _dedupe(history)
+
+    budget = token_budget(model)
+    fixed = sum(message_tokens(m) for m in system) + tools_tokens(tools)
+    remaining = budget - fixed
+
+    kept = []
+    for message in reversed(history):
+        cost = message_tokens(message)
+        # Le tour courant est toujours gardé, même s'il dépasse seul le budget
+        if kept and cost > remaining:
+            break
+        kept.append(message)
+        remaining -= cost
+    kept.reverse()
+
+    messages = system + kept
+    built = budget - remaining
+    _stats.add(prompts=1, built_tokens=built, naive_tokens=naive_tokens,
+               history_dropped=len(history) - len(kept))
+    print(f"🧮 Prompt tokens: {naive_tokens} -> {built} (budget {budget}, "
+          f"{len(kept)}/{len(history)} messages, {len(tools or [])} tools)")
+    return messages, tools
@@ -0,0 +1,103 @@
+# core/responses.py
+"""
+Réponses en français construites directement depuis les résultats des tools,
+au format imposé par SYSTEM_PROMPT, sans second appel LLM.
+Un renderer retourne None quand le résultat demande une vraie synthèse (ex : chunks PDF).
+"""
+from collections import Counter
+
+from core.metrics import Counters
+from tools.contact import request_contact
+
+NOT_FOUND_MESSAGE = (
+    "Désolé, cet article n'est pas disponible. Puis-je vous proposer un produit similaire\n"
+    "ou souhaitez-vous contacter un agent commercial ?\n\n"
+    "1️⃣ Voir un produit similaire\n"
+    "2️⃣ Contacter un agent commercial"
+)
+NO_IMAGE_MESSAGE = (
+    "Désolé, pas d'image disponible pour ce produit actuellement.\n"
+    "Voulez-vous que je vous donne le numéro d'un agent commercial pour plus d'informations ?\n\n"
+    "1️⃣ Oui, donnez-moi le numéro\n"
+    "2️⃣ Non, je continue mes achats"
+)
+CONTACT_OPTIONS = {"1": "REQUEST_CONTACT", "2": "CONTINUE"}
+# Après une image (SYSTEM_PROMPT : "Souhaitez-vous l'ajouter au panier ?")
+IMAGE_OPTIONS = {"1": "ADD_TO_CART", "2": "SEE_MORE"}
+# Options de render_product_list quand un seul produit est listé (il devient le produit courant)
+PRODUCT_LIST_OPTIONS = {"1": "SHOW_IMAGE", "2": "ADD_TO_CART", "3": "REQUEST_CONTACT"}
+
+
+def _format_price(price, currency) -> str:
+    if isinstance(price, float) and price.is_integer():
+        price = int(price)
+    return f"{price} {currency or ''}".strip()
+
+
+def render_product_list(products) -> str:
+    lines = ["Voici les articles disponibles :", ""]
+    for p in products:
+        lines.append(f"• **{p.name}** — Prix : {_format_price(p.price, p.currency)}")
+    lines += [
+        "",
+        "Souhaitez-vous :",
+        "1️⃣ Voir l'image d'un de ces produits",
+        "2️⃣ Ajouter un produit au panier",
+        "3️⃣ Contacter un agent commercial",
+    ]
+    return "\n".join(lines)
+
+
+def render_tool_result(tool_name: str, result, products=None, pdf_matches=None):
+    """
+    Réponse agent (dict, même forme que CommercialAgent.run) pour un résultat de tool,
+    avec éventuellement un "pending_options" {numéro: action}, ou None si le LLM doit rédiger.
+    """
+    if tool_name == "search_products":
+        if pdf_matches:
+            return None  # texte libre extrait des PDF : synthèse par le LLM
+        if not products:
+            return {"type": "text", "message": NOT_FOUND_MESSAGE}
+        # Plusieurs produits : "1" / "2" doivent préciser lequel, le choix passe par les suggestions
+        return {"type": "text", "message": render_product_list(products),
+                "pending_options": PRODUCT_LIST_OPTIONS if len(products) == 1 else None}
+
+    if tool_name == "search_product_image":
+        if isinstance(result, dict) and result.get("image_url"):
+            message = (
+                f"🖼️ {result.get('name', 'Produit')}\n\n"
+                "Souhaitez-vous l'ajouter au panier ?\n\n"
+                "1️⃣ Ajouter au panier\n"
+                "2️⃣ Voir des produits similaires"
+            )
+            return {"type": "product_image", "product": result, "message": message,
+                    "pending_options": IMAGE_OPTIONS}
+        return {"type": "text", "message": NO_IMAGE_MESSAGE, "pending_options": CONTACT_OPTIONS}
+
+    if tool_name == "request_contact":
+        return {"type": "request_contact", "message": request_contact()}
+
+    return None
+
+
+# Tours où le second appel LLM a été évité
+_stats = Counters(rendered_turns=0, rendered={}, llm_synthesis=0)
+
+
+def record_render(tool_names, rendered: bool):
+    if rendered:
+        _stats.add(rendered_turns=1, rendered=Counter(tool_names))
+    else:
+        _stats.add(llm_synthesis=1)
+
+
+def get_render_stats() -> dict:
+    stats = _stats.snapshot()
+    rendered = stats["rendered_turns"]
+    total = rendered + stats["llm_synthesis"]
+    return {
+        "rendered_turns": rendered,
+        "rendered_by_tool": stats["rendered"],
+        "llm_synthesis": stats["llm_synthesis"],
+        "second_llm_calls_skipped_rate": round(rendered / total, 3) if total else 0.0,
+    }
@@ -0,0 +1,95 @@
+# core/speculation.py
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from rapidfuzz import fuzz
+
+from config.settings import SPECULATIVE_EXECUTOR_WORKERS
+
+from core.metrics import Counters
+from retrieval.normalize import normalize_query
+from retrieval.retriever import get_retriever
+from tools.search_products import SEARCH_TOP_K
+
+# Pool dédié : un tool qui attend sa spéculation (take) ne doit jamais bloquer le pool des tools
+# dans lequel il tourne lui-même
+_speculation_executor = ThreadPoolExecutor(max_workers=SPECULATIVE_EXECUTOR_WORKERS, thread_name_prefix="speculation")
+
+# Spéculations lancées et leur devenir
+_stats = Counters(started=0, hits=0, query_mismatch=0, unused=0, wasted_ms=0.0, overlapped_ms=0.0)
+# Scores des 1000 derniers rapprochements requête du tool / message utilisateur
+_match_scores = deque(maxlen=1000)
+
+
+def get_speculation_stats() -> dict:
+    stats = _stats.snapshot()
+    consumed = stats["hits"] + stats["query_mismatch"]
+    scores = sorted(_match_scores)
+    return {
+        "started": stats["started"],
+        "hits": stats["hits"],
+        "query_mismatch": stats["query_mismatch"],
+        "unused": stats["unused"],
+        "hit_rate": round(stats["hits"] / stats["started"], 3) if stats["started"] else 0.0,
+        "hit_rate_when_searched": round(stats["hits"] / consumed, 3) if consumed else 0.0,
+        # Retrieval fait pour rien (requête différente ou pas de search_products)
+        "wasted_ms": round(stats["wasted_ms"]),
+        # Retrieval déjà terminé (ou en cours) quand le tool l'a demandé
+        "overlapped_ms": round(stats["overlapped_ms"]),
+        "median_match_score": scores[len(scores) // 2] if scores else None,
+    }
+
+
+class SpeculativeSearch:
+    """
+    Retrieval du message utilisateur lancé pendant le premier appel LLM.
+    Si le LLM appelle ensuite search_products avec une requête proche du message
+    (token_set_ratio >= min_score sur les textes normalisés), les candidats
+    déjà récupérés sont réutilisés ; sinon le travail est compté comme perdu.
+    """
+
+    def __init__(self, user_input: str, min_score: float = 80):
+        self.user_input = user_input
+        self.min_score = min_score
+        self.consumed = False
+        self._elapsed_ms = None
+        self._future = _speculation_executor.submit(self._search)
+        _stats.add(started=1)
+
+    def _search(self):
+        start = time.perf_counter()
+        try:
+            return get_retriever().search(self.user_input, top_k=SEARCH_TOP_K)
+        finally:
+            self._elapsed_ms = (time.perf_counter() - start) * 1000
+
+    def take(self, query: str):
+        """Candidats spéculatifs si query ressemble au message utilisateur, sinon None."""
+        if self.consumed:
+            return None
+        score = fuzz.token_set_ratio(normalize_query(query), normalize_query(self.user_input))
+        _match_scores.append(round(score))
+        if score < self.min_score:
+            return None
+
+        self.consumed = True
+        try:
+            results = self._future.result()
+        except Exception as e:
+            print(f"⚠️  Speculative search failed: {e}")
+            return None
+        _stats.add(hits=1, overlapped_ms=self._elapsed_ms or 0.0)
+        return results
+
+    def finish(self, searched: bool):
+        """Fin du tour : compte la spéculation non utilisée (searched = search_products appelé)."""
+        if self.consumed:
+            return
+        self.consumed = True
+        _stats.add(**({"query_mismatch": 1} if searched else {"unused": 1}))
+
+        def add_wasted(future):
+            _stats.add(wasted_ms=self._elapsed_ms or 0.0)
+
+        self._future.add_done_callback(add_wasted)
@@ -0,0 +1,129 @@
+# core/working_set.py
+import re
+import threading
+
+from core.metrics import Counters
+from retrieval.normalize import normalize_query, strip_accents
+
+ORDINALS = {
+    "premier": 1, "premiere": 1, "1er": 1, "1ere": 1,
+    "deuxieme": 2, "second": 2, "seconde": 2, "2e": 2, "2eme": 2,
+    "troisieme": 3, "3e": 3, "3eme": 3,
+    "quatrieme": 4, "4e": 4, "4eme": 4,
+    "cinquieme": 5, "5e": 5, "5eme": 5,
+    "dernier": -1, "derniere": -1,
+}
+_ORDINAL_RE = re.compile(r"\b(" + "|".join(ORDINALS) + r")\b")
+_NUMBER_RE = re.compile(r"\b(?:numero|num|n°|no|produit|article|le|la)\s*(\d)\b")
+
+_global_stats = Counters(hits=0, misses=0)
+
+
+def get_working_set_stats() -> dict:
+    stats = _global_stats.snapshot()
+    total = stats["hits"] + stats["misses"]
+    return {
+        **stats,
+        "vector_queries_saved": stats["hits"],
+        "hit_rate": round(stats["hits"] / total, 3) if total else 0.0,
+    }
+
+
+def _as_dict(product) -> dict:
+    get = product.get if isinstance(product, dict) else (lambda k, d=None: getattr(product, k, d))
+    return {
+        "id": str(get("id")),
+        "name": get("name", ""),
+        "category": get("category"),
+        "price": get("price"),
+        "currency": get("currency"),
+        "in_stock": get("in_stock", False),
+        "stock_quantity": get("stock_quantity"),
+        "image_url": get("image_url"),
+    }
+
+
+class ProductWorkingSet:
+    """
+    Produits récemment montrés dans une conversation, indexés par id et par nom normalisé.
+    Permet de résoudre "le deuxième", un nom de produit déjà affiché ou un SKU
+    sans relancer une recherche vectorielle.
+    """
+
+    def __init__(self, max_size: int = 30):
+        self.max_size = max_size
+        self.by_id = {}
+        self.by_name = {}
+        self.last_shown = []  # ordre d'affichage de la dernière liste (pour les ordinaux)
+        self._lock = threading.RLock()  # tools d'un même tour exécutés en parallèle
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def add(self, products, shown: bool = True):
+        """Ajoute des produits (Product ou dict) ; shown=True => devient la liste de référence."""
+        items = [_as_dict(p) for p in products if p]
+        if not items:
+            return
+        with self._lock:
+            self._add(items, shown)
+
+    def _add(self, items, shown: bool):
+        for item in items:
+            self.by_id.pop(item["id"], None)
+            self.by_id[item["id"]] = item
+            self.by_name[normalize_query(item["name"])] = item["id"]
+        if shown:
+            self.last_shown = [item["id"] for item in items]
+
+        # Oublier les plus anciens
+        while len(self.by_id) > self.max_size:
+            oldest = next(iter(self.by_id))
+            removed = self.by_id.pop(oldest)
+            self.by_name.pop(normalize_query(removed["name"]), None)
+
+    def _by_ordinal(self, text: str):
+        plain = strip_accents(text.lower())
+        match = _ORDINAL_RE.search(plain)
+        position = ORDINALS[match.group(1)] if match else None
+        if position is None:
+            number = _NUMBER_RE.search(plain)
+            position = int(number.group(1)) if number else None
+        if position is None or not self.last_shown:
+            return None
+        index = position - 1 if position > 0 else len(self.last_shown) + position
+        if 0 <= index < len(self.last_shown):
+            return self.by_id.get(self.last_shown[index])
+        return None
+
+    def _by_name(self, text: str):
+        normalized = normalize_query(text)
+        for token in normalized.split():
+            if token.upper() in self.by_id:
+                return self.by_id[token.upper()]
+        for name, pid in self.by_name.items():
+            if name and name in normalized:
+                return self.by_id[pid]
+
+        # Tous les mots significatifs de la requête dans le nom d'un seul produit
+        words = [w for w in normalized.split() if len(w) > 2]
+        if not words:
+            return None
+        candidates = [pid for name, pid in self.by_name.items() if all(w in name for w in words)]
+        return self.by_id[candidates[0]] if len(candidates) == 1 else None
+
+    def resolve(self, text: str):
+        """Produit désigné par text (ordinal, SKU ou nom), sinon None. Compte hits / misses."""
+        with self._lock:
+            product = (self._by_ordinal(text) or self._by_name(text)) if text else None
+        _global_stats.add(**{"hits" if product else "misses": 1})
+        if product:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return product
+
+    def stats(self) -> dict:
+        return {"size": len(self.by_id), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,168 @@
+import numpy as np
+
+
+def exact_top_k(matrix: np.ndarray, query: np.ndarray, top_k: int, mask=None, rows=None):
+    """
+    Top-k exact par produit scalaire (vecteurs normalisés => cosinus).
+    rows : sous-ensemble de lignes candidates (None = toute la matrice).
+    Retourne (rows, scores) triés par score décroissant.
+    """
+    if rows is None:
+        scores = matrix @ query
+        candidates = None
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+    else:
+        if mask is not None:
+            rows = rows[mask[rows]]
+        scores = matrix[rows] @ query
+        candidates = rows
+
+    available = scores.shape[0] if mask is None or rows is not None else int(mask.sum())
+    top_k = min(top_k, available)
+    if top_k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    best = np.argpartition(-scores, top_k - 1)[:top_k]
+    best = best[np.argsort(-scores[best])]
+    result_rows = best if candidates is None else candidates[best]
+    return result_rows, scores[best]
+
+
+class IVFFlatIndex:
+    """
+    Index IVF-flat (inverted file) pour la recherche approximative.
+
+    - Entraînement : k-means sphérique sur un échantillon -> nlist centroïdes
+    - Chaque vecteur est rangé dans la liste de son centroïde le plus proche
+    - Requête : on ne parcourt que les nprobe listes les plus proches, puis
+      recherche exacte sur ces candidats. Plus nprobe est grand, meilleur est
+      le rappel (nprobe = nlist équivaut à la recherche exacte).
+
+    Les affectations sont alignées sur les lignes de la matrice du store :
+    les insertions sont incrémentales (affectation au centroïde existant),
+    les listes inversées sont reconstruites paresseusement après modification.
+    """
+
+    def __init__(self, nlist: int, nprobe: int = 8, kmeans_iters: int = 10,
+                 sample_per_list: int = 32, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.kmeans_iters = kmeans_iters
+        self.sample_per_list = sample_per_list
+        self.seed = seed
+        self.centroids = None
+        self.trained_size = 0
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._size = 0
+        self._lists = None  # (rows triées par liste, bornes) ; None = à reconstruire
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    # ------------------------------------------------------------------
+    # Entraînement / affectation
+    # ------------------------------------------------------------------
+
+    def _nearest_centroid(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        out = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], chunk):
+            block = vectors[start:start + chunk] @ self.centroids.T
+            out[start:start + chunk] = block.argmax(axis=1)
+        return out
+
+    def train(self, vectors: np.ndarray):
+        """k-means sphérique sur un échantillon, puis affectation de tous les vecteurs."""
+        n = vectors.shape[0]
+        nlist = min(self.nlist, n)
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n, nlist * self.sample_per_list)
+        sample = vectors[rng.choice(n, sample_size, replace=False)]
+
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            labels = (sample @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+
+            # Listes vides : réinitialiser sur un point aléatoire
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        self.centroids = centroids
+        self.nlist = nlist
+        self.trained_size = n
+        self._assign = self._nearest_centroid(vectors)
+        self._size = n
+        self._lists = None
+
+    def set_rows(self, rows, vectors: np.ndarray):
+        """Insertion / mise à jour incrémentale de lignes (sans ré-entraînement)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return
+        needed = int(rows.max()) + 1
+        if needed > self._assign.shape[0]:
+            grown = np.zeros(max(needed, self._assign.shape[0] * 2), dtype=np.int32)
+            grown[:self._size] = self._assign[:self._size]
+            self._assign = grown
+        self._assign[rows] = self._nearest_centroid(vectors)
+        self._size = max(self._size, needed)
+        self._lists = None
+
+    def move_row(self, src: int, dst: int):
+        self._assign[dst] = self._assign[src]
+        self._lists = None
+
+    def truncate(self, size: int):
+        self._size = size
+        self._lists = None
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def _inverted_lists(self):
+        if self._lists is None:
+            assign = self._assign[:self._size]
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(self.nlist + 1))
+            self._lists = (order, bounds)
+        return self._lists
+
+    def candidates(self, query: np.ndarray, nprobe=None) -> np.ndarray:
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        order, bounds = self._inverted_lists()
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        return np.concatenate([order[bounds[c]:bounds[c + 1]] for c in probe])
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, top_k: int, mask=None, nprobe=None):
+        rows = self.candidates(query, nprobe)
+        return exact_top_k(matrix, query, top_k, mask=mask, rows=rows)
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def state(self) -> dict:
+        return {
+            "centroids": self.centroids,
+            "assign": self._assign[:self._size],
+            "trained_size": self.trained_size,
+        }
+
+    def restore(self, centroids: np.ndarray, assign: np.ndarray, trained_size: int):
+        self.centroids = centroids.astype(np.float32)
+        self.nlist = centroids.shape[0]
+        self._assign = assign.astype(np.int32)
+        self._size = assign.shape[0]
+        self.trained_size = trained_size
+        self._lists = None
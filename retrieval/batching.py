@@ -0,0 +1,100 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatchEmbedder:
+    """
+    Regroupe les appels concurrents à encode() en un seul lot.
+
+    Chaque appelant dépose son texte dans une file et attend son Future.
+    Un thread unique vide la file : dès qu'un texte arrive, il attend au plus
+    max_wait_ms que d'autres le rejoignent (ou que le lot atteigne
+    max_batch_size), encode le lot en un seul forward pass et rend à chacun
+    son propre vecteur.
+    """
+
+    def __init__(self, model, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = {}
+        self._queue_delays_ms = deque(maxlen=2000)
+        self._encode_ms = deque(maxlen=2000)
+        self.batches = 0
+        self.items = 0
+        self._worker = threading.Thread(target=self._run, name="embedding-microbatch", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def embed(self, text: str):
+        """Encode text (préfixe déjà appliqué) via le prochain lot ; bloque jusqu'au résultat."""
+        return self.submit(text).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                vectors = self.model.encode([text for text, _, _ in batch],
+                                            batch_size=len(batch), normalize_embeddings=True)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            encode_ms = (time.perf_counter() - started) * 1000
+            for (_, future, _), vector in zip(batch, vectors):
+                future.set_result(vector.tolist())
+
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(batch)
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+                self._encode_ms.append(encode_ms)
+                self._queue_delays_ms.extend((started - queued) * 1000 for _, _, queued in batch)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            delays = np.array(self._queue_delays_ms) if self._queue_delays_ms else np.zeros(1)
+            encode = np.array(self._encode_ms) if self._encode_ms else np.zeros(1)
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "queue_delay_ms": {
+                    "mean": round(float(delays.mean()), 2),
+                    "p95": round(float(np.percentile(delays, 95)), 2),
+                },
+                "encode_ms": {
+                    "mean": round(float(encode.mean()), 2),
+                    "p95": round(float(np.percentile(encode, 95)), 2),
+                },
+                "queued": self._queue.qsize(),
+            }
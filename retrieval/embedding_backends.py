@@ -0,0 +1,78 @@
+"""
+Backends d'inférence CPU pour le modèle d'embedding
+
+    torch       SentenceTransformer fp32 (par défaut)
+    torch-int8  quantification dynamique int8 des couches Linear (torch, sans dépendance)
+    onnx        graphe ONNX exécuté par onnxruntime
+    onnx-int8   graphe ONNX quantifié int8 (dynamique), exporté une fois dans ONNX_EXPORT_DIR
+
+Les backends onnx nécessitent: pip install "optimum[onnxruntime]"
+"""
+import re
+from pathlib import Path
+
+import numpy as np
+
+from config.settings import ONNX_EXPORT_DIR, ONNX_QUANTIZATION_CONFIG
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+
+def _quantized_onnx_dir(model_name: str) -> Path:
+    return Path(ONNX_EXPORT_DIR) / re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+
+
+def _load_onnx_int8(model_name: str):
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    export_dir = _quantized_onnx_dir(model_name)
+    file_name = f"onnx/model_qint8_{ONNX_QUANTIZATION_CONFIG}.onnx"
+
+    if not (export_dir / file_name).exists():
+        print(f"⚙️ Export ONNX int8 ({ONNX_QUANTIZATION_CONFIG}) de {model_name} → {export_dir}")
+        model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+        model.save(str(export_dir))
+        export_dynamic_quantized_onnx_model(model, ONNX_QUANTIZATION_CONFIG, str(export_dir))
+
+    return SentenceTransformer(str(export_dir), backend="onnx", device="cpu",
+                               model_kwargs={"file_name": file_name})
+
+
+def load_sentence_transformer(model_name: str, backend: str = "torch"):
+    """Charge model_name (nom Hugging Face ou chemin local) avec le backend demandé."""
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+
+    if backend == "torch-int8":
+        import torch
+
+        model = SentenceTransformer(model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx", device="cpu")
+
+    if backend == "onnx-int8":
+        return _load_onnx_int8(model_name)
+
+    raise ValueError(f"Unknown embedding backend: {backend} (choices: {', '.join(BACKENDS)})")
+
+
+def check_parity(reference, candidate, threshold: float = 0.98) -> dict:
+    """
+    Compare deux jeux d'embeddings normalisés ligne à ligne (même textes).
+    passed=True si la similarité cosinus minimale dépasse threshold.
+    """
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosines = (reference * candidate).sum(axis=1)
+    return {
+        "mean_cosine": float(cosines.mean()),
+        "min_cosine": float(cosines.min()),
+        "threshold": threshold,
+        "passed": bool(cosines.min() >= threshold),
+    }
@@ -0,0 +1,204 @@
+"""
+Cache disque des embeddings de passages (catalogue + chunks PDF)
+
+Un fichier par modèle :
+    <model>.f16         matrice float16 (n x dimension), ajout en fin de fichier
+    <model>.index.json  hash sha256 du texte -> numéro de ligne
+    <model>.lock        verrou inter-process (filelock)
+
+Usage:
+    python -m retrieval.embedding_cache stats
+    python -m retrieval.embedding_cache compact [--max-entries N]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+from filelock import FileLock
+
+from config.settings import (
+    EMBEDDING_DIMENSION,
+    EMBEDDING_MODEL_NAME,
+    PASSAGE_EMBEDDING_CACHE_DIR,
+)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PassageEmbeddingCache:
+    """
+    Cache persistant hash(texte) -> embedding, partagé entre process.
+
+    Les écrivains ajoutent les lignes au fichier de données puis publient le
+    nouvel index (remplacement atomique) sous verrou : un lecteur ne voit donc
+    jamais une ligne à moitié écrite. Les lectures passent par un np.memmap
+    réouvert quand l'index change.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME,
+                 dimension: int = EMBEDDING_DIMENSION,
+                 path=PASSAGE_EMBEDDING_CACHE_DIR):
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.dir = Path(path)
+        self.dimension = dimension
+        self.data_file = self.dir / f"{slug}.f16"
+        self.index_file = self.dir / f"{slug}.index.json"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._file_lock = FileLock(str(self.dir / f"{slug}.lock"))
+        self._lock = threading.Lock()
+        self._index = {}
+        self._index_mtime = None
+        self._matrix = None
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def _current_mtime(self):
+        try:
+            return self.index_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self):
+        """Recharge index + memmap si un autre process a publié un nouvel index."""
+        mtime = self._current_mtime()
+        if mtime == self._index_mtime:
+            return
+        with self._file_lock:
+            self._read_locked()
+
+    def _read_locked(self):
+        self._index_mtime = self._current_mtime()
+        if self._index_mtime is None:
+            self._index, self._matrix = {}, None
+            return
+
+        with open(self.index_file, "r", encoding="utf-8") as f:
+            self._index = json.load(f)
+
+        rows = os.path.getsize(self.data_file) // (2 * self.dimension)
+        self._matrix = (
+            np.memmap(self.data_file, dtype=np.float16, mode="r", shape=(rows, self.dimension))
+            if rows else None
+        )
+
+    def get_many(self, hashes) -> dict:
+        """Retourne {hash: vecteur float32} pour les hashes présents dans le cache."""
+        with self._lock:
+            self._refresh()
+            found = {}
+            for h in hashes:
+                row = self._index.get(h)
+                if row is not None and self._matrix is not None and row < self._matrix.shape[0]:
+                    found[h] = np.asarray(self._matrix[row], dtype=np.float32)
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+            return found
+
+    # ------------------------------------------------------------------
+    # Ecriture
+    # ------------------------------------------------------------------
+
+    def _publish_index(self, index: dict):
+        tmp = self.index_file.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, self.index_file)
+
+    def put_many(self, hashes, vectors):
+        with self._lock, self._file_lock:
+            # Relire l'index sous verrou : un autre process a pu ajouter les mêmes textes
+            self._read_locked()
+            index = dict(self._index)
+            new_rows, seen = [], set()
+            for h, vector in zip(hashes, vectors):
+                if h not in index and h not in seen:
+                    seen.add(h)
+                    new_rows.append((h, vector))
+            if not new_rows:
+                return 0
+
+            row_bytes = 2 * self.dimension
+            size = os.path.getsize(self.data_file) if self.data_file.exists() else 0
+            start_row = size // row_bytes
+            if size % row_bytes:
+                # Ligne partielle laissée par un écrivain interrompu
+                os.truncate(self.data_file, start_row * row_bytes)
+            block = np.asarray([v for _, v in new_rows], dtype=np.float16)
+            with open(self.data_file, "ab") as f:
+                f.write(block.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            for offset, (h, _) in enumerate(new_rows):
+                index[h] = start_row + offset
+            self._publish_index(index)
+            self._read_locked()
+            return len(new_rows)
+
+    def compact(self, max_entries=None) -> dict:
+        """
+        Réécrit le cache sans les lignes orphelines ; avec max_entries, ne garde
+        que les entrées les plus récentes (numéros de ligne les plus élevés).
+        """
+        with self._lock, self._file_lock:
+            self._read_locked()
+            before_rows = self._matrix.shape[0] if self._matrix is not None else 0
+            entries = sorted(self._index.items(), key=lambda item: item[1])
+            if max_entries is not None:
+                entries = entries[-max_entries:] if max_entries > 0 else []
+
+            tmp_data = self.data_file.with_suffix(".f16.tmp")
+            if entries:
+                rows = np.fromiter((row for _, row in entries), dtype=np.int64)
+                np.asarray(self._matrix[rows], dtype=np.float16).tofile(tmp_data)
+            else:
+                tmp_data.write_bytes(b"")
+
+            self._matrix = None
+            os.replace(tmp_data, self.data_file)
+            self._publish_index({h: new_row for new_row, (h, _) in enumerate(entries)})
+            self._read_locked()
+            return {"rows_before": before_rows, "rows_after": len(entries)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "rows": self._matrix.shape[0] if self._matrix is not None else 0,
+                "size_mb": round(os.path.getsize(self.data_file) / (1024 * 1024), 2)
+                if self.data_file.exists() else 0.0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("--max-entries", type=int, default=None)
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    args = parser.parse_args()
+
+    cache = PassageEmbeddingCache(args.model)
+    if args.command == "compact":
+        result = cache.compact(max_entries=args.max_entries)
+        print(f"🧹 Compaction : {result['rows_before']} → {result['rows_after']} lignes")
+    print(f"📊 {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,198 @@
-from config.settings import EMBEDDING_MODEL_NAME
-from sentence_transformers import SentenceTransformer
+import resource
+import threading
+import time
+
+from config.settings import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MICROBATCH_ENABLED,
+    EMBEDDING_MICROBATCH_MAX_SIZE,
+    EMBEDDING_MICROBATCH_MAX_WAIT_MS,
+    EMBEDDING_MODEL_NAME,
+    PASSAGE_EMBEDDING_CACHE_ENABLED,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    QUERY_EMBEDDING_CACHE_TTL,
+)
+from retrieval.cache import TTLCache
+from retrieval.normalize import normalize_query
+
+# --- Registre des modèles partagé par tout le process ---
+# Un seul SentenceTransformer par (nom de modèle, backend), chargé à la première demande.
+_models = {}
+_models_lock = threading.Lock()
+_startup_report = {}
+
+# Un cache de requêtes par modèle, partagé par toutes les instances d'EmbeddingModel
+_query_caches = {}
+_passage_caches = {}
+_query_executors = {}
+
+
+def _rss_mb() -> float:
+    """Pic de mémoire résidente du process (Linux : ru_maxrss en Ko)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def model_key(model_name: str, backend: str) -> str:
+    """Clé de registre / de cache : les embeddings int8 ne sont pas mélangés aux fp32."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def get_shared_model(model_name: str = EMBEDDING_MODEL_NAME, backend: str = EMBEDDING_BACKEND):
+    """
+    Retourne l'instance SentenceTransformer partagée pour (model_name, backend).
+    Thread-safe : deux threads qui demandent le même modèle en même temps
+    ne le chargent qu'une seule fois.
+    """
+    key = model_key(model_name, backend)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            from retrieval.embedding_backends import load_sentence_transformer
+
+            rss_before = _rss_mb()
+            start = time.perf_counter()
+            model = load_sentence_transformer(model_name, backend)
+            load_seconds = time.perf_counter() - start
+
+            _startup_report[key] = {
+                "load_seconds": round(load_seconds, 2),
+                "rss_before_mb": round(rss_before, 1),
+                "rss_after_mb": round(_rss_mb(), 1),
+            }
+            print(f"🧠 Modèle {key} chargé en {load_seconds:.1f}s "
+                  f"(RSS {rss_before:.0f} → {_rss_mb():.0f} Mo)")
+            _models[key] = model
+
+    return model
+
+
+def get_startup_report() -> dict:
+    """Temps de chargement et RSS pour chaque modèle chargé dans ce process."""
+    return {
+        "models_loaded": len(_models),
+        "models": {name: dict(info) for name, info in _startup_report.items()},
+        "rss_mb": round(_rss_mb(), 1),
+    }
+
+
+def get_query_cache(model_name: str = EMBEDDING_MODEL_NAME) -> TTLCache:
+    with _models_lock:
+        cache = _query_caches.get(model_name)
+        if cache is None:
+            cache = TTLCache(QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL)
+            _query_caches[model_name] = cache
+    return cache
+
+
+def get_query_cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in _query_caches.items()}
+
+
+def get_passage_cache(model_name: str = EMBEDDING_MODEL_NAME):
+    """Cache disque des passages (None si désactivé par PASSAGE_EMBEDDING_CACHE_ENABLED)."""
+    if not PASSAGE_EMBEDDING_CACHE_ENABLED:
+        return None
+    with _models_lock:
+        cache = _passage_caches.get(model_name)
+        if cache is None:
+            from retrieval.embedding_cache import PassageEmbeddingCache
+            cache = PassageEmbeddingCache(model_name)
+            _passage_caches[model_name] = cache
+    return cache
+
+
+def get_query_executor(key: str, model):
+    """Exécuteur de micro-batching partagé (None si EMBEDDING_MICROBATCH_ENABLED est faux)."""
+    if not EMBEDDING_MICROBATCH_ENABLED:
+        return None
+    with _models_lock:
+        executor = _query_executors.get(key)
+        if executor is None:
+            from retrieval.batching import MicroBatchEmbedder
+            executor = MicroBatchEmbedder(model, EMBEDDING_MICROBATCH_MAX_SIZE,
+                                          EMBEDDING_MICROBATCH_MAX_WAIT_MS)
+            _query_executors[key] = executor
+    return executor
+
+
+def get_query_executor_stats() -> dict:
+    return {key: executor.stats() for key, executor in _query_executors.items()}
+
 
 class EmbeddingModel:
-    def __init__(self):
-        self.model = SentenceTransformer("intfloat/multilingual-e5-large")
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, backend: str = EMBEDDING_BACKEND):
+        self.model_name = model_name
+        self.backend = backend
+        self.model = get_shared_model(model_name, backend)
+        self.query_cache = get_query_cache(model_key(model_name, backend))
+        self.passage_cache = get_passage_cache(model_key(model_name, backend))
+        self.query_executor = get_query_executor(model_key(model_name, backend), self.model)
 
     def embed_query(self, text: str):
-        text = f"query: {text}"
-        return self.model.encode(text, normalize_embeddings=True).tolist()
+        # "Chemises  Blanches" et "chemise blanche" partagent la même entrée
+        key = normalize_query(text)
+        vector = self.query_cache.get(key)
+        if vector is not None:
+            return list(vector)
+
+        if self.query_executor is not None:
+            # Regroupé avec les requêtes concurrentes des autres threads
+            vector = self.query_executor.embed(f"query: {text}")
+        else:
+            vector = self.model.encode(f"query: {text}", normalize_embeddings=True).tolist()
+        self.query_cache.set(key, tuple(vector))
+        return vector
 
     def embed_passage(self, text: str):
         text = f"passage: {text}"
         return self.model.encode(text, normalize_embeddings=True).tolist()
+
+    def embed_passages(self, texts, batch_size: int = EMBEDDING_BATCH_SIZE):
+        """
+        Encode une liste de passages par lots.
+        Les textes sont triés par longueur pour que chaque lot contienne des
+        textes de taille proche (moins de padding), puis remis dans l'ordre d'origine.
+        Les textes déjà présents dans le cache disque ne sont pas ré-encodés.
+        """
+        if not texts:
+            return []
+
+        vectors = [None] * len(texts)
+        hashes = None
+        if self.passage_cache is not None:
+            from retrieval.embedding_cache import text_hash
+            hashes = [text_hash(t) for t in texts]
+            cached = self.passage_cache.get_many(hashes)
+            for i, h in enumerate(hashes):
+                if h in cached:
+                    vectors[i] = cached[h].tolist()
+
+        missing = [i for i in range(len(texts)) if vectors[i] is None]
+        order = sorted(missing, key=lambda i: len(texts[i]))
+
+        # Un seul put_many par appel : l'index du cache est réécrit une fois, pas à chaque lot
+        new_hashes, new_vectors = [], []
+        try:
+            for start in range(0, len(order), batch_size):
+                bucket = order[start:start + batch_size]
+                encoded = self.model.encode(
+                    [f"passage: {texts[i]}" for i in bucket],
+                    batch_size=batch_size,
+                    normalize_embeddings=True,
+                )
+                for i, vector in zip(bucket, encoded):
+                    vectors[i] = vector.tolist()
+                if self.passage_cache is not None:
+                    new_hashes += [hashes[i] for i in bucket]
+                    new_vectors += list(encoded)
+        finally:
+            # Même interrompu, ce qui a été encodé est gardé pour la prochaine ingestion
+            if new_hashes:
+                self.passage_cache.put_many(new_hashes, new_vectors)
+
+        return vectors
@@ -1,52 +1,130 @@
+import hashlib
+import json
 import os
+import sys
+import time
+from pathlib import Path
 from catalog.loader import load_catalog
-from retrieval.embeddings import EmbeddingModel
-from retrieval.vectorstore import PineconeVectorStore
+from config.settings import EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME, VECTOR_STORE_BACKEND
+from retrieval.embeddings import EmbeddingModel, model_key
+from retrieval.vectorstore import get_vector_store
 
-def ingest():
+# Manifeste id produit -> hash du contenu indexé (pour l'ingestion incrémentale)
+MANIFEST_PATH = Path(__file__).parent.parent / "data" / "ingest_manifest.json"
+
+
+def product_text(product) -> str:
+    # Texte combiné pour E5/BGE
+    return f"{product.name}. {product.description}. {product.category}"
+
+
+def product_metadata(product) -> dict:
+    # Metadata complète + "type" pour filtrage Pinecone
+    return {
+        "id": str(product.id),
+        "name": product.name,
+        "category": product.category,
+        "description": product.description,
+        "price": product.price,
+        "currency": product.currency,
+        "in_stock": product.in_stock,
+        "stock_quantity": product.stock_quantity,
+        "image_url": product.image_url,
+        "type": "product"  # ✅ indispensable
+    }
+
+
+def content_hash(text: str, metadata: dict) -> str:
+    payload = json.dumps({"text": text, "metadata": metadata}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_manifest() -> dict:
+    if MANIFEST_PATH.exists():
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(manifest: dict):
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = MANIFEST_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def ingest(full: bool = False):
+    """
+    Indexe le catalogue dans le vector store.
+
+    Par défaut l'ingestion est incrémentale : seuls les produits nouveaux ou
+    modifiés (hash du contenu différent du manifeste) sont encodés et upsertés,
+    et seuls les produits retirés du catalogue sont supprimés. L'index reste
+    en ligne pendant toute l'opération.
+    full=True (ou --full) recrée l'index et ré-encode tout le catalogue.
+    """
     # --- Charger le catalogue ---
     products = load_catalog()
     if not products:
         print("⚠️ Aucun produit trouvé dans catalog.json")
         return
 
-    # --- Initialiser embeddings ---
-    embeddings_model = EmbeddingModel()
-    
-    # --- Créer PineconeVectorStore et recréer l'index propre ---
-    store = PineconeVectorStore(recreate_index=True)
+    # --- Le manifeste n'est valable que pour le même modèle / backend ---
+    manifest = load_manifest()
+    model = model_key(EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND)
+    if (manifest.get("model") != model
+            or manifest.get("backend") != VECTOR_STORE_BACKEND):
+        full = True
 
-    # --- Préparer les vecteurs pour Pinecone ---
-    vectors = []
+    store = get_vector_store(recreate_index=full)
+    previous = {} if full else manifest.get("products", {})
+
+    # --- Calculer le diff catalogue <-> manifeste ---
+    current = {}
+    changed = []
     for product in products:
-        # Texte combiné pour E5/BGE
-        text = f"{product.name}. {product.description}. {product.category}"
-        vector = embeddings_model.embed_passage(text)
-
-        # Metadata complète + "type" pour filtrage Pinecone
-        metadata = {
-            "id": str(product.id),
-            "name": product.name,
-            "category": product.category,
-            "description": product.description,
-            "price": product.price,
-            "currency": product.currency,
-            "in_stock": product.in_stock,
-            "stock_quantity": product.stock_quantity,
-            "image_url": product.image_url,
-            "type": "product"  # ✅ indispensable
-        }
-
-        # Construire le dictionnaire pour Pinecone
-        vectors.append({
-            "id": str(product.id),
-            "values": vector,
-            "metadata": metadata
-        })
-
-    # --- Injection dans Pinecone ---
-    store.upsert(vectors)
-    print(f"✅ {len(vectors)} produits indexés dans Pinecone.")
+        text = product_text(product)
+        metadata = product_metadata(product)
+        digest = content_hash(text, metadata)
+        current[metadata["id"]] = digest
+        if previous.get(metadata["id"]) != digest:
+            changed.append((text, metadata))
+
+    removed = [pid for pid in previous if pid not in current]
+    print(f"🔎 {len(changed)} produit(s) nouveaux/modifiés, {len(removed)} supprimé(s), "
+          f"{len(products) - len(changed)} inchangé(s)")
+
+    # --- Encoder uniquement les produits modifiés, par lots ---
+    embed_seconds = 0.0
+    if changed:
+        embeddings_model = EmbeddingModel()
+        start = time.perf_counter()
+        embeddings = embeddings_model.embed_passages([text for text, _ in changed])
+        embed_seconds = time.perf_counter() - start
+        if embeddings_model.passage_cache is not None:
+            print(f"💾 Cache embeddings : {embeddings_model.passage_cache.stats()}")
+
+        # --- Injection dans le vector store ---
+        store.upsert([
+            {"id": metadata["id"], "values": vector, "metadata": metadata}
+            for (_, metadata), vector in zip(changed, embeddings)
+        ])
+
+    if removed:
+        store.delete(ids=removed)
+        print(f"🗑️ {len(removed)} produit(s) retiré(s) de l'index.")
+
+    save_manifest({
+        "model": model,
+        "backend": VECTOR_STORE_BACKEND,
+        "products": current,
+    })
+
+    print(f"✅ {len(changed)} produits indexés.")
+    if changed:
+        print(f"⏱️ Embeddings : {embed_seconds:.1f}s "
+              f"({len(changed) / max(embed_seconds, 1e-9):.1f} produits/s)")
 
 if __name__ == "__main__":
-    ingest()
+    ingest(full="--full" in sys.argv)
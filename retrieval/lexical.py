@@ -0,0 +1,147 @@
+import math
+import threading
+from collections import Counter
+
+from catalog.index import get_catalog_index
+from catalog.loader import CATALOG_PATH
+from retrieval.normalize import normalize_query
+from retrieval.pdf_chunks import PDF_CHUNKS_PATH, load_chunks
+
+# Mots vides (forme normalisée : sans accents, au singulier)
+STOPWORDS = {
+    "le", "la", "les", "l", "un", "une", "de", "du", "des", "d", "et", "ou", "a", "au", "aux",
+    "en", "pour", "par", "avec", "sur", "dan", "je", "tu", "il", "on", "nou", "vou", "me", "moi",
+    "veu", "voudrai", "cherche", "montre", "voir", "svp", "est", "ce", "cet", "cette", "ca",
+    "qui", "que", "quel", "quelle", "mon", "ma", "me", "se", "sa", "son", "plu", "tre",
+}
+
+
+def tokenize(text: str) -> list:
+    return [t for t in normalize_query(text).split() if t not in STOPWORDS and len(t) > 1]
+
+
+class BM25Index:
+    """Index inversé BM25 (Okapi) : terme -> [(doc, tf)]."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self._postings = {}
+        self._doc_len = []
+        self._avg_len = 0.0
+        self._idf = {}
+
+    def build(self, documents):
+        """documents : itérable de (doc_id, texte)"""
+        self.doc_ids, self._postings, self._doc_len = [], {}, []
+        for doc, (doc_id, text) in enumerate(documents):
+            counts = Counter(tokenize(text))
+            self.doc_ids.append(doc_id)
+            self._doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((doc, tf))
+
+        n = len(self.doc_ids)
+        self._avg_len = (sum(self._doc_len) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        return self
+
+    def search(self, query: str, top_k: int = 10):
+        """Retourne [(doc_id, score)] triés par score décroissant."""
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc] / self._avg_len)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.doc_ids[doc], score) for doc, score in best]
+
+
+class CatalogLexicalIndex:
+    """
+    BM25 sur les produits (nom, catégorie, description) et le texte des chunks PDF,
+    plus une table de correspondance exacte nom normalisé / SKU -> produit.
+    Reconstruit automatiquement quand catalog.json ou pdf_chunks.json change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self.bm25 = BM25Index()
+        self.products = {}
+        self.chunks = {}
+        self._exact = {}
+
+    @staticmethod
+    def _file_version():
+        return tuple(
+            path.stat().st_mtime_ns if path.exists() else None
+            for path in (CATALOG_PATH, PDF_CHUNKS_PATH)
+        )
+
+    def _refresh(self):
+        version = self._file_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            products = dict(get_catalog_index().products)
+            chunks = {c["id"]: c for c in load_chunks()}
+
+            documents = [
+                # Le nom est répété pour peser plus que la description ; l'id permet la recherche par SKU
+                (("product", pid), f"{pid} {p.name} {p.name} {p.category} {p.description}")
+                for pid, p in products.items()
+            ]
+            documents += [(("pdf_document", cid), c["text"]) for cid, c in chunks.items()]
+
+            exact = {}
+            for pid, p in products.items():
+                exact[normalize_query(p.name)] = pid
+                exact[normalize_query(pid)] = pid
+
+            self.bm25 = BM25Index().build(documents)
+            self.products, self.chunks, self._exact = products, chunks, exact
+            self._version = version
+
+    def exact_match(self, query: str):
+        """Produit dont le nom ou l'id (SKU) correspond exactement à la requête, sinon None."""
+        self._refresh()
+        pid = self._exact.get(normalize_query(query))
+        return self.products.get(pid) if pid else None
+
+    def search(self, query: str, top_k: int = 10):
+        """[((type, id), score)] — type = "product" ou "pdf_document"."""
+        self._refresh()
+        return self.bm25.search(query, top_k)
+
+    def pdf_item(self, chunk_id: str, score: float = 0.0):
+        chunk = self.chunks.get(chunk_id)
+        if chunk is None:
+            return None
+        return {
+            "id": chunk_id,
+            "type": "pdf_document",
+            "text": chunk["text"],
+            "filename": chunk["filename"],
+            "document_id": chunk["document_id"],
+            "score": score,
+        }
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60):
+    """Fusionne plusieurs listes de clés ordonnées : score = somme de 1 / (k + rang)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,500 @@
+import json
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+from filelock import FileLock
+
+from config.settings import (
+    ANN_MIN_VECTORS,
+    ANN_NLIST,
+    ANN_NPROBE,
+    EMBEDDING_DIMENSION,
+    LOCAL_INDEX_MODE,
+    LOCAL_VECTOR_STORE_PATH,
+)
+from retrieval.ann import IVFFlatIndex, exact_top_k
+
+
+def _matches_value(value, condition) -> bool:
+    if isinstance(condition, dict):
+        if "$in" in condition:
+            return value in condition["$in"]
+        if "$eq" in condition:
+            return value == condition["$eq"]
+        if "$ne" in condition:
+            return value != condition["$ne"]
+        if "$nin" in condition:
+            return value not in condition["$nin"]
+        raise ValueError(f"Unsupported filter operator: {condition}")
+    return value == condition
+
+
+class LocalVectorStore:
+    """
+    Store vectoriel en mémoire, recherche par similarité cosinus.
+
+    - Vecteurs normalisés en float32 dans une matrice contiguë (produit scalaire = cosinus)
+    - Top-k vectorisé avec np.argpartition
+    - index_mode="ivf" : index IVF-flat approximatif au-delà de ANN_MIN_VECTORS
+      vecteurs (nprobe règle le compromis rappel / latence)
+    - Filtres Pinecone $in / $eq / $ne / $nin ; le champ "type" est indexé
+      sous forme de codes entiers pour un masque vectorisé
+    - Persistance sur disque par versions : segments immuables (segments/s<N>.npy +
+      .json) ; une version v<N>/ liste ses segments (+ ivf.npz) et est publiée en
+      remplaçant le fichier CURRENT : un lecteur voit toujours un état cohérent.
+      Un upsert de nouveaux vecteurs n'écrit que ses lignes (nouveau segment) et
+      les lecteurs ne chargent que les segments ajoutés
+    - Ecrivains de plusieurs process (admin backend, ingestion) sérialisés par un
+      verrou fichier (filelock) autour de relecture / modification / sauvegarde
+    """
+
+    INDEXED_FIELD = "type"
+    # Ré-entraîner l'IVF quand le store a grossi de ce facteur depuis l'entraînement
+    RETRAIN_GROWTH = 4
+
+    def __init__(self, path=LOCAL_VECTOR_STORE_PATH, dimension=EMBEDDING_DIMENSION,
+                 recreate_index=False, index_mode=LOCAL_INDEX_MODE,
+                 nlist=ANN_NLIST, nprobe=ANN_NPROBE, min_ann_vectors=ANN_MIN_VECTORS):
+        self.path = Path(path)
+        self.dimension = dimension
+        self.index_mode = index_mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_ann_vectors = min_ann_vectors
+        self._lock = threading.RLock()
+        # Incrémentée à chaque modification en place de lignes existantes (voir query)
+        self._generation = 0
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._file_lock = FileLock(str(self.path / "store.lock"))
+        self._version = None
+        self._loaded_stamp = None
+        self._reset()
+
+        if recreate_index:
+            self.save()
+        else:
+            self._load()
+
+    # ------------------------------------------------------------------
+    # Etat interne
+    # ------------------------------------------------------------------
+
+    def _reset(self):
+        self._generation += 1
+        self._vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        self._size = 0
+        self._ids = []
+        self._metadata = []
+        self._id_to_row = {}
+        self._type_codes = np.zeros(0, dtype=np.int32)
+        self._type_vocab = {}
+        self._ann = None
+        # Segments publiés chargés, lignes qu'ils couvrent, plus petite ligne publiée modifiée depuis
+        self._segments = []
+        self._persisted_rows = 0
+        self._dirty_row = None
+
+    def _type_code(self, value) -> int:
+        code = self._type_vocab.get(value)
+        if code is None:
+            code = len(self._type_vocab)
+            self._type_vocab[value] = code
+        return code
+
+    def _ensure_capacity(self, rows: int):
+        capacity = self._vectors.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 64)
+        vectors = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        codes = np.zeros(new_capacity, dtype=np.int32)
+        codes[:self._size] = self._type_codes[:self._size]
+        self._vectors, self._type_codes = vectors, codes
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    VERSION_RE = re.compile(r"^v(\d+)$")
+    # Au-delà, la sauvegarde suivante fusionne les segments en un seul
+    MAX_SEGMENTS = 32
+
+    @property
+    def _current_file(self) -> Path:
+        return self.path / "CURRENT"
+
+    @property
+    def _segments_dir(self) -> Path:
+        return self.path / "segments"
+
+    def _current_version(self):
+        try:
+            return self._current_file.read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _version_dir(self, version) -> Path:
+        # Sans CURRENT : ancien format, fichiers directement dans self.path
+        return self.path / version if version else self.path
+
+    def _stamp(self):
+        """Identité du dernier état publié (CURRENT est remplacé, donc nouvel inode)."""
+        for file in (self._current_file, self.path / "meta.json"):
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            return (file.name, stat.st_ino, stat.st_mtime_ns)
+        return None
+
+    def _load(self):
+        with self._lock:
+            for attempt in range(3):
+                try:
+                    # Première tentative : seulement les segments ajoutés depuis la version chargée
+                    return self._load_version(incremental=attempt == 0)
+                except (FileNotFoundError, ValueError):
+                    # Version remplacée puis nettoyée pendant la lecture : relire CURRENT
+                    if attempt == 2:
+                        raise
+
+    def _load_version(self, incremental: bool = True):
+        stamp = self._stamp()
+        version = self._current_version()
+        directory = self._version_dir(version)
+
+        segments_file = directory / "segments.json"
+        if segments_file.exists():
+            with open(segments_file, "r", encoding="utf-8") as f:
+                segments = json.load(f)["segments"]
+            unchanged = self._dirty_row is None and self._size == self._persisted_rows
+            if incremental and unchanged and segments[:len(self._segments)] == self._segments:
+                new_segments = segments[len(self._segments):]
+            else:
+                self._reset()
+                new_segments = segments
+            for name in new_segments:
+                self._append_segment(name)
+            self._segments, self._persisted_rows = list(segments), self._size
+        else:
+            # Ancien format : vectors.npy + meta.json, réécrit en segment à la prochaine sauvegarde
+            self._reset()
+            if (directory / "meta.json").exists():
+                self._append_files(directory / "vectors.npy", directory / "meta.json")
+
+        self._ann = None
+        ivf_file = directory / "ivf.npz"
+        if self.index_mode == "ivf" and ivf_file.exists():
+            state = np.load(ivf_file)
+            if state["assign"].shape[0] == self._size:
+                self._ann = IVFFlatIndex(state["centroids"].shape[0], self.nprobe)
+                self._ann.restore(state["centroids"], state["assign"],
+                                  int(state["trained_size"]))
+        self._version, self._loaded_stamp = version, stamp
+
+    def _append_segment(self, name: str):
+        self._append_files(self._segments_dir / f"{name}.npy", self._segments_dir / f"{name}.json")
+
+    def _append_files(self, vectors_file: Path, meta_file: Path):
+        """Ajoute en fin de matrice les lignes d'un couple (vecteurs, meta)."""
+        with open(meta_file, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(vectors_file)
+        if vectors.shape[0] != len(meta["ids"]) or (vectors.size and vectors.shape[1] != self.dimension):
+            raise ValueError(f"Store local corrompu : {vectors_file}")
+
+        start, end = self._size, self._size + vectors.shape[0]
+        self._ensure_capacity(end)
+        self._vectors[start:end] = vectors
+        self._ids.extend(meta["ids"])
+        self._metadata.extend(meta["metadata"])
+        for row in range(start, end):
+            self._id_to_row[self._ids[row]] = row
+            self._type_codes[row] = self._type_code(self._metadata[row].get(self.INDEXED_FIELD))
+        self._size = end
+
+    def _write_segment(self, name: str, start: int, end: int):
+        """Segment immuable : lignes [start, end) de la matrice et leurs métadonnées."""
+        self._segments_dir.mkdir(parents=True, exist_ok=True)
+        tmp_vectors = self._segments_dir / f"{name}.tmp.npy"
+        np.save(tmp_vectors, self._vectors[start:end])
+        os.replace(tmp_vectors, self._segments_dir / f"{name}.npy")
+        tmp_meta = self._segments_dir / f"{name}.json.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids[start:end], "metadata": self._metadata[start:end]}, f, ensure_ascii=False)
+        os.replace(tmp_meta, self._segments_dir / f"{name}.json")
+
+    def _reload_if_changed(self):
+        stamp = self._stamp()
+        if stamp is not None and stamp != self._loaded_stamp:
+            self._load()
+
+    def save(self):
+        """
+        Publie l'état courant comme nouvelle version v<N+1>.
+        Si seules des lignes ont été ajoutées, seul un segment avec ces lignes est écrit ;
+        une mise à jour / suppression de lignes déjà publiées réécrit un segment complet.
+        """
+        with self._lock, self._file_lock:
+            current = self._current_version()
+            match = self.VERSION_RE.match(current or "")
+            number = int(match.group(1)) + 1 if match else 1
+            version = f"v{number}"
+
+            append_only = (self._dirty_row is None and self._size >= self._persisted_rows
+                           and len(self._segments) < self.MAX_SEGMENTS)
+            segments, start = (list(self._segments), self._persisted_rows) if append_only else ([], 0)
+            if self._size > start:
+                name = f"s{number:06d}"
+                self._write_segment(name, start, self._size)
+                segments.append(name)
+
+            # Répertoire de version écrit à côté, puis renommé : jamais visible à moitié
+            tmp_dir = self.path / f"{version}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir(parents=True)
+            if self._ann is not None and self._ann.is_trained:
+                np.savez(tmp_dir / "ivf.npz", **self._ann.state())
+            with open(tmp_dir / "segments.json", "w", encoding="utf-8") as f:
+                json.dump({"dimension": self.dimension, "rows": self._size, "segments": segments}, f)
+            # Reste d'un écrivain interrompu avant la publication de CURRENT
+            shutil.rmtree(self.path / version, ignore_errors=True)
+            os.replace(tmp_dir, self.path / version)
+
+            tmp_current = self.path / "CURRENT.tmp"
+            tmp_current.write_text(version, encoding="utf-8")
+            os.replace(tmp_current, self._current_file)
+
+            previous_segments = self._segments
+            self._segments, self._persisted_rows, self._dirty_row = segments, self._size, None
+            self._version, self._loaded_stamp = version, self._stamp()
+            self._prune(keep_versions={version, current}, keep_segments=set(segments) | set(previous_segments))
+
+    def _prune(self, keep_versions, keep_segments):
+        """Supprime les anciennes versions et segments ; la version précédente reste pour les lecteurs en cours."""
+        for entry in self.path.iterdir():
+            if entry.is_dir() and self.VERSION_RE.match(entry.name) and entry.name not in keep_versions:
+                shutil.rmtree(entry, ignore_errors=True)
+        if self._segments_dir.exists():
+            for entry in self._segments_dir.iterdir():
+                if entry.name.split(".")[0] not in keep_segments:
+                    entry.unlink()
+        # Fichiers de l'ancien format, remplacés par la première version publiée
+        for name in ("vectors.npy", "meta.json", "ivf.npz"):
+            legacy = self.path / name
+            if legacy.exists():
+                legacy.unlink()
+
+    def _mark_dirty(self, row: int):
+        """Ligne déjà publiée modifiée en place : la prochaine sauvegarde réécrit tout."""
+        if row < self._persisted_rows:
+            self._dirty_row = row if self._dirty_row is None else min(self._dirty_row, row)
+
+    # ------------------------------------------------------------------
+    # API VectorStore
+    # ------------------------------------------------------------------
+
+    def upsert(self, vectors, batch_size=100):
+        if not vectors:
+            print("⚠️ Aucun vecteur à upserter !")
+            return
+
+        # Relecture / modification / sauvegarde sous verrou inter-process : pas de mise à jour perdue
+        with self._lock, self._file_lock:
+            self._reload_if_changed()
+            values = self._normalize(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+            rows = []
+
+            for item, vector in zip(vectors, values):
+                vid = str(item["id"])
+                metadata = item.get("metadata") or {}
+                row = self._id_to_row.get(vid)
+                if row is None:
+                    row = self._size
+                    self._ensure_capacity(row + 1)
+                    self._size += 1
+                    self._ids.append(vid)
+                    self._metadata.append(metadata)
+                    self._id_to_row[vid] = row
+                else:
+                    self._metadata[row] = metadata
+                    self._mark_dirty(row)
+                    self._generation += 1
+                self._vectors[row] = vector
+                self._type_codes[row] = self._type_code(metadata.get(self.INDEXED_FIELD))
+                rows.append(row)
+
+            # Insertion incrémentale dans l'IVF (affectation au centroïde le plus proche)
+            if self._ann is not None:
+                self._ann.set_rows(rows, self._vectors[rows])
+            # Entraînement côté écrivain (ingestion) : les lecteurs chargent ivf.npz avec la version
+            if self._needs_training():
+                self._train()
+
+            self.save()
+        print(f"✅ {len(vectors)} vecteurs upsertés dans le store local.")
+
+    def _filter_mask(self, filter):
+        """Masque booléen des lignes qui satisfont le filtre (None = pas de filtre)."""
+        if not filter:
+            return None
+
+        mask = np.ones(self._size, dtype=bool)
+        for field, condition in filter.items():
+            if field == self.INDEXED_FIELD:
+                if isinstance(condition, dict) and ("$ne" in condition or "$nin" in condition):
+                    excluded = condition.get("$nin", [condition.get("$ne")])
+                    codes = [self._type_vocab[v] for v in excluded if v in self._type_vocab]
+                    mask &= ~np.isin(self._type_codes[:self._size], codes)
+                    continue
+                if isinstance(condition, dict):
+                    allowed = condition.get("$in", [condition.get("$eq")])
+                else:
+                    allowed = [condition]
+                codes = [self._type_vocab[v] for v in allowed if v in self._type_vocab]
+                mask &= np.isin(self._type_codes[:self._size], codes)
+            else:
+                mask &= np.fromiter(
+                    (_matches_value(m.get(field), condition) for m in self._metadata),
+                    dtype=bool, count=self._size,
+                )
+        return mask
+
+    def _needs_training(self) -> bool:
+        if self.index_mode != "ivf" or self._size < self.min_ann_vectors:
+            return False
+        return self._ann is None or self._size > self.RETRAIN_GROWTH * self._ann.trained_size
+
+    def _train(self):
+        nlist = self.nlist or max(1, int(4 * np.sqrt(self._size)))
+        self._ann = IVFFlatIndex(nlist, self.nprobe)
+        self._ann.train(self._vectors[:self._size])
+
+    def train_index(self):
+        """(Ré)entraîne l'index IVF sur le contenu actuel du store et publie une nouvelle version."""
+        with self._lock, self._file_lock:
+            self._reload_if_changed()
+            self._train()
+            self.save()
+
+    def _use_ann(self) -> bool:
+        """IVF seulement s'il est déjà entraîné : la requête ne lance jamais de k-means (recherche exacte sinon)."""
+        return (self.index_mode == "ivf" and self._size >= self.min_ann_vectors
+                and self._ann is not None and self._ann.is_trained)
+
+    # Tentatives hors verrou avant de chercher entièrement sous verrou (écritures en place répétées)
+    QUERY_ATTEMPTS = 3
+
+    def _snapshot(self, query: np.ndarray, filter, nprobe):
+        """(génération, matrice, masque, lignes candidates IVF ou None) de l'état courant (sous verrou)."""
+        candidates = self._ann.candidates(query, nprobe) if self._use_ann() else None
+        return self._generation, self._vectors[:self._size], self._filter_mask(filter), candidates
+
+    def _matches(self, rows, scores, include_metadata: bool) -> dict:
+        if not include_metadata:
+            return {"matches": [{"id": self._ids[row], "score": float(score)} for row, score in zip(rows, scores)]}
+        return {
+            "matches": [
+                {"id": self._ids[row], "score": float(score), "metadata": self._metadata[row]}
+                for row, score in zip(rows, scores)
+            ]
+        }
+
+    def query(self, vector, top_k=5, filter=None, nprobe=None, include_metadata=True):
+        """
+        Le verrou ne couvre que la capture de l'état (vue de la matrice, masque, candidats)
+        et la lecture des ids : le produit matrice-vecteur et le top-k tournent hors verrou,
+        en parallèle entre threads. Les ajouts n'écrivent qu'au-delà de la vue capturée ;
+        une modification en place incrémente _generation et la recherche est refaite.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        for _ in range(self.QUERY_ATTEMPTS):
+            with self._lock:
+                self._reload_if_changed()
+                if self._size == 0:
+                    return {"matches": []}
+                generation, matrix, mask, candidates = self._snapshot(query, filter, nprobe)
+
+            rows, scores = exact_top_k(matrix, query, top_k, mask=mask, rows=candidates)
+
+            with self._lock:
+                if generation == self._generation:
+                    return self._matches(rows, scores, include_metadata)
+
+        with self._lock:
+            _, matrix, mask, candidates = self._snapshot(query, filter, nprobe)
+            rows, scores = exact_top_k(matrix, query, top_k, mask=mask, rows=candidates)
+            return self._matches(rows, scores, include_metadata)
+
+    def fetch_metadata(self, ids) -> dict:
+        """{id: metadata} des ids présents dans le store."""
+        with self._lock:
+            self._reload_if_changed()
+            return {i: self._metadata[self._id_to_row[i]] for i in ids if i in self._id_to_row}
+
+    def _remove_row(self, row: int):
+        """Suppression O(1) : la dernière ligne prend la place de la ligne supprimée."""
+        last = self._size - 1
+        removed_id = self._ids[row]
+        self._mark_dirty(row)
+        self._generation += 1
+        if self._ann is not None:
+            if row != last:
+                self._ann.move_row(last, row)
+            self._ann.truncate(last)
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._type_codes[row] = self._type_codes[last]
+            self._ids[row] = self._ids[last]
+            self._metadata[row] = self._metadata[last]
+            self._id_to_row[self._ids[row]] = row
+        self._ids.pop()
+        self._metadata.pop()
+        del self._id_to_row[removed_id]
+        self._size -= 1
+
+    def delete(self, ids=None, filter=None):
+        with self._lock, self._file_lock:
+            self._reload_if_changed()
+            if ids:
+                rows = [self._id_to_row[str(vid)] for vid in ids if str(vid) in self._id_to_row]
+            elif filter:
+                rows = np.flatnonzero(self._filter_mask(filter)).tolist()
+            else:
+                return 0
+
+            # Supprimer de la fin vers le début pour garder les index valides
+            for row in sorted(rows, reverse=True):
+                self._remove_row(row)
+            if rows:
+                self.save()
+            return len(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._reload_if_changed()
+            return {
+                "backend": "local",
+                "total_vector_count": self._size,
+                "dimension": self.dimension,
+                "index_fullness": 0.0,
+                "index_mode": self.index_mode,
+                "version": self._version,
+                "ann_trained": bool(self._ann is not None and self._ann.is_trained),
+                "nprobe": self.nprobe,
+            }
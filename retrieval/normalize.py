@@ -0,0 +1,29 @@
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s-]")
+
+
+def strip_accents(text: str) -> str:
+    """'Chaussures légères' -> 'Chaussures legeres'"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _singular(word: str) -> str:
+    # Pluriels triviaux du français : chemises -> chemise, chapeaux -> chapeau
+    if len(word) > 3 and word[-1] in ("s", "x") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def normalize_query(text: str) -> str:
+    """
+    Forme canonique d'une requête utilisateur, utilisée comme clé de cache :
+    minuscules, sans accents, sans ponctuation, espaces compactés, pluriels simples retirés.
+    """
+    text = strip_accents(text.lower())
+    text = _PUNCT_RE.sub(" ", text)
+    words = _WHITESPACE_RE.split(text.strip())
+    return " ".join(_singular(w) for w in words if w)
@@ -0,0 +1,47 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+# Copie locale du texte des chunks PDF indexés (pour l'index lexical BM25)
+PDF_CHUNKS_PATH = Path(__file__).parent.parent / "data" / "pdf_chunks.json"
+
+_lock = threading.Lock()
+
+
+def load_chunks() -> list:
+    """[{"id", "document_id", "filename", "chunk_index", "text"}, ...]"""
+    if not PDF_CHUNKS_PATH.exists():
+        return []
+    with open(PDF_CHUNKS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_chunks(chunks: list):
+    PDF_CHUNKS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = PDF_CHUNKS_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(chunks, f, ensure_ascii=False)
+    os.replace(tmp_path, PDF_CHUNKS_PATH)
+
+
+def add_document_chunks(document_id: str, filename: str, chunks: list):
+    """Enregistre les chunks d'un document (mêmes ids que les vecteurs : <document_id>_chunk_<i>)."""
+    with _lock:
+        existing = [c for c in load_chunks() if c["document_id"] != document_id]
+        existing += [
+            {
+                "id": f"{document_id}_chunk_{i}",
+                "document_id": document_id,
+                "filename": filename,
+                "chunk_index": i,
+                "text": chunk[:1000],
+            }
+            for i, chunk in enumerate(chunks)
+        ]
+        _save_chunks(existing)
+
+
+def delete_document_chunks(document_id: str):
+    with _lock:
+        _save_chunks([c for c in load_chunks() if c["document_id"] != document_id])
@@ -0,0 +1,55 @@
+from functools import lru_cache
+
+from rapidfuzz import fuzz, process
+
+PRODUCT_MIN_SCORE = 70
+PDF_MIN_SCORE = 75
+# En dessous, le coût de démarrage des threads dépasse le gain du parallélisme
+PARALLEL_MIN_CHOICES = 256
+
+
+@lru_cache(maxsize=8192)
+def _lower(text: str) -> str:
+    # Champs minuscules calculés une seule fois par texte distinct (noms, catégories, chunks)
+    return text.lower()
+
+
+def fuzzy_filter(query: str, results, lexical_ids=frozenset()):
+    """
+    Sépare les résultats du retriever en (produits, pdf) pertinents pour la requête.
+
+    Un produit est gardé si son nom ou sa catégorie a un partial_ratio > 70,
+    un chunk PDF si la requête apparaît dans le texte ou si partial_ratio > 75.
+    Les éléments trouvés par l'index lexical sont toujours gardés.
+    Tous les scores sont calculés en un seul appel process.cdist.
+    """
+    query_lower = query.lower()
+    products = [item for item in results if hasattr(item, "name")]
+    pdfs = [item for item in results if isinstance(item, dict)]
+
+    # Chunks déjà acceptés sans score flou (id lexical ou sous-chaîne exacte)
+    pdf_texts = [_lower(d.get("text", "")) for d in pdfs]
+    pdf_direct = [d.get("id") in lexical_ids or query_lower in text for d, text in zip(pdfs, pdf_texts)]
+    pdf_to_score = [text for text, direct in zip(pdf_texts, pdf_direct) if not direct]
+
+    choices = [_lower(p.name) for p in products] + [_lower(p.category) for p in products] + pdf_to_score
+    scores = []
+    if choices:
+        workers = -1 if len(choices) >= PARALLEL_MIN_CHOICES else 1
+        # score_cutoff : rapidfuzz abandonne tôt les paires sous le seuil (score < cutoff -> 0),
+        # la comparaison stricte "> seuil" reste faite ci-dessous
+        scores = process.cdist([query_lower], choices, scorer=fuzz.partial_ratio, processor=None,
+                               score_cutoff=PRODUCT_MIN_SCORE, workers=workers)[0]
+
+    n = len(products)
+    kept_products = [
+        p for p, name_score, category_score in zip(products, scores[:n], scores[n:2 * n])
+        if str(p.id) in lexical_ids or name_score > PRODUCT_MIN_SCORE or category_score > PRODUCT_MIN_SCORE
+    ]
+
+    pdf_scores = iter(scores[2 * n:])
+    kept_pdfs = [
+        d for d, direct in zip(pdfs, pdf_direct)
+        if direct or next(pdf_scores) > PDF_MIN_SCORE
+    ]
+    return kept_products, kept_pdfs
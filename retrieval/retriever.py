@@ -1,67 +1,290 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import List, Union, Dict
+from config.settings import (
+    HYBRID_SEARCH_ENABLED, RRF_K, RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL, VECTOR_QUERY_ID_ONLY,
+    LOCAL_VECTOR_STORE_PATH,
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL,
+)
+from retrieval.cache import TTLCache
 from retrieval.embeddings import EmbeddingModel
-from retrieval.vectorstore import PineconeVectorStore
+from retrieval.ingest_catalog import MANIFEST_PATH
+from retrieval.lexical import CatalogLexicalIndex, reciprocal_rank_fusion
+from retrieval.normalize import normalize_query
+from retrieval.pdf_chunks import PDF_CHUNKS_PATH
+from retrieval.semantic_cache import SemanticCache
+from retrieval.vectorstore import get_vector_store
+from catalog.index import get_catalog_index
+from catalog.loader import CATALOG_PATH
 from catalog.schema import Product
 from catalog.validator import filter_available_products
 
+DOCUMENTS_PATH = Path(__file__).parent.parent / "data" / "documents.json"
+# Version publiée du store local (remplacée à chaque upsert / delete)
+LOCAL_STORE_CURRENT_PATH = Path(LOCAL_VECTOR_STORE_PATH) / "CURRENT"
+SEARCH_FILTER = {"type": {"$in": ["product", "pdf_document"]}}
+PRODUCT_FILTER = {"type": {"$eq": "product"}}
+PDF_FILTER = {"type": {"$eq": "pdf_document"}}
+
+
+def catalog_version() -> tuple:
+    """
+    Version du contenu indexable : mtimes de catalog.json et des fichiers écrits par
+    l'admin à chaque upload / suppression de PDF, plus l'état du store lui-même
+    (manifeste écrit en fin d'ingestion, CURRENT du store local) : une recherche faite
+    pendant l'ingestion n'est plus servie depuis le cache une fois celle-ci terminée.
+    Partagée entre processus via le disque.
+    """
+    return tuple(
+        path.stat().st_mtime_ns if path.exists() else None
+        for path in (CATALOG_PATH, PDF_CHUNKS_PATH, DOCUMENTS_PATH, MANIFEST_PATH, LOCAL_STORE_CURRENT_PATH)
+    )
+
+
+def run_sync(coro):
+    """Exécute une coroutine depuis du code synchrone (routes Flask), avec ou sans boucle active."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
 
 class ProductRetriever:
     def __init__(self, top_k: int = 3, score_threshold: float = 0.3):
         self.embeddings = EmbeddingModel()
-        self.store = PineconeVectorStore()
+        self.store = get_vector_store()
+        self.lexical = CatalogLexicalIndex()
         self.top_k = top_k
         self.score_threshold = score_threshold
+        # Résultats finaux par (requête, top_k, filtre, version) ; réponses brutes du store
+        # par (requête, filtre, version) pour servir un top_k plus petit sans requête
+        self.result_cache = TTLCache(RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL)
+        self.match_cache = TTLCache(RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL)
+        # Paraphrases : même réponse du store si les embeddings sont assez proches
+        self.semantic_cache = (
+            SemanticCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL) if SEMANTIC_CACHE_ENABLED else None
+        )
+        self.id_only = VECTOR_QUERY_ID_ONLY
+        self.stats = {"searches": 0, "lexical_fast_path": 0, "store_queries": 0, "metadata_fetches": 0}
+
+    def lexical_match_ids(self, query: str, top_k: int | None = None) -> set:
+        """Ids (produits et chunks) qui contiennent au moins un terme de la requête."""
+        top_k = top_k or self.top_k
+        return {doc_id for (_, doc_id), _ in self.lexical.search(query, top_k * 2)}
+
+    def _match_key(self, enriched_query: str, filter: dict, version: tuple) -> tuple:
+        return (normalize_query(enriched_query), json.dumps(filter, sort_keys=True), version)
+
+    def _cached_matches(self, enriched_query: str, depth: int, filter: dict, version: tuple):
+        """Matches en cache pour depth résultats (une requête plus profonde est tronquée), sinon None."""
+        cached = self.match_cache.get(self._match_key(enriched_query, filter, version))
+        if cached is not None and cached[0] >= depth:
+            return cached[1][:depth]
+        return None
+
+    def _query_store(self, vector, enriched_query: str, depth: int, filter: dict, version: tuple) -> list:
+        match_key = self._match_key(enriched_query, filter, version)
+        if self.semantic_cache is not None:
+            matches = self.semantic_cache.get(vector, match_key[1], depth, version)
+            if matches is not None:
+                self.match_cache.set(match_key, (depth, matches))
+                return matches
+
+        results = self.store.query(
+            vector=vector,
+            top_k=depth,
+            filter=filter,
+            include_metadata=not self.id_only  # ID-only: hydrated locally after ranking
+        )
+        self.stats["store_queries"] += 1
+        matches = results.get("matches", [])
+        self.match_cache.set(match_key, (depth, matches))
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(vector, match_key[1], depth, matches, version)
+        return matches
 
-    def search(self, query: str, intent: str | None = None) -> List[Union[Product, Dict]]:
+    async def _amatches(self, enriched_query: str, subqueries, version: tuple) -> list:
+        """
+        Une liste de matches par (filtre, quota) de subqueries. Les sous-requêtes absentes
+        du cache partent en parallèle (threads) sur un seul embedding de la requête.
+        """
+        cached = [self._cached_matches(enriched_query, depth, f, version) for f, depth in subqueries]
+        if all(matches is not None for matches in cached):
+            return cached
+
+        vector = await asyncio.to_thread(self.embeddings.embed_query, enriched_query)
+
+        async def run(matches, filter, depth):
+            if matches is not None:
+                return matches
+            return await asyncio.to_thread(self._query_store, vector, enriched_query, depth, filter, version)
+
+        return await asyncio.gather(*(
+            run(matches, f, depth) for matches, (f, depth) in zip(cached, subqueries)
+        ))
+
+    @staticmethod
+    def _item_from_metadata(item_id: str, metadata: dict, score: float = 0):
+        """Product ou dict PDF depuis les métadonnées du store (None si illisible)."""
+        metadata = dict(metadata)
+        item_type = metadata.pop("type", None)
+        if item_type == "product":
+            # Convert to Product object
+            try:
+                return Product(**metadata)
+            except Exception as e:
+                print(f"⚠️  Could not parse product: {e}")
+                return None
+        if item_type == "pdf_document":
+            # Keep as dict with all metadata
+            return {
+                "id": item_id,
+                "type": "pdf_document",
+                "text": metadata.get("text", ""),
+                "filename": metadata.get("filename", ""),
+                "document_id": metadata.get("document_id", ""),
+                "score": score
+            }
+        return None
+
+    async def asearch(self, query: str, intent: str | None = None, top_k: int | None = None,
+                      pdf_top_k: int | None = None) -> List[Union[Product, Dict]]:
         """
         Search for both products AND PDF documents
         Returns a mix of Product objects and dict for PDF documents
+
+        One product query and one PDF query run concurrently on the same
+        embedding, each with its own quota (top_k * 2 products, pdf_top_k
+        chunks), so PDF chunks can no longer crowd out products.
+        Hybrid mode: vector results are fused with BM25 results (reciprocal
+        rank fusion). A query equal to a product name or SKU skips embedding.
+        Results are cached per catalog version, so an upload or a catalog.json
+        change invalidates them without any explicit call.
         """
+        self.stats["searches"] += 1
+        top_k = top_k or self.top_k
+        product_quota, pdf_quota = top_k * 2, pdf_top_k or top_k
+        subqueries = [(PRODUCT_FILTER, product_quota), (PDF_FILTER, pdf_quota)]
+        version = catalog_version()
+
         # Enrichir la requête pour E5
         enriched_query = (
             f"Intent: {intent}. {query}" if intent else query
         )
 
-        vector = self.embeddings.embed_query(enriched_query)
+        cache_key = (normalize_query(enriched_query), top_k, json.dumps(subqueries, sort_keys=True), version)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
 
-        # ✅ FIXED: Search BOTH products AND PDF documents
-        results = self.store.query(
-            vector=vector,
-            top_k=self.top_k * 2,  # Get more results to include both types
-            filter={"type": {"$in": ["product", "pdf_document"]}}  # ← INCLUDE BOTH!
-        )
+        # ⚡ Lexical fast path: exact product name / SKU, no embedding needed
+        if HYBRID_SEARCH_ENABLED:
+            exact = self.lexical.exact_match(query)
+            if exact is not None and get_catalog_index().is_available(exact.id):
+                self.stats["lexical_fast_path"] += 1
+                self.result_cache.set(cache_key, [exact])
+                return [exact]
+
+        product_matches, pdf_matches = await self._amatches(enriched_query, subqueries, version)
+
+        items = {}
+        scores = {}
+        vector_rankings = []
+
+        for item_type, matches in (("product", product_matches), ("pdf_document", pdf_matches)):
+            ranking = []
+            for match in matches:
+                key = (item_type, match["id"])
+                metadata = match.get("metadata")
+                if metadata:
+                    item = self._item_from_metadata(match["id"], metadata, match.get("score", 0))
+                    if item is None:
+                        continue
+                    items[key] = item
+                # ID-only match: content is hydrated after ranking
+                scores[key] = match.get("score", 0)
+                ranking.append(key)
+            vector_rankings.append(ranking)
+
+        if HYBRID_SEARCH_ENABLED:
+            lexical_ranking = [key for key, _ in self.lexical.search(query, product_quota + pdf_quota)]
+            ranking = reciprocal_rank_fusion(vector_rankings + [lexical_ranking], k=RRF_K)
+        else:
+            ranking = [key for keys in vector_rankings for key in keys]
+
+        # Per-type quotas after fusion
+        ranking = ([key for key in ranking if key[0] == "product"][:product_quota] +
+                   [key for key in ranking if key[0] == "pdf_document"][:pdf_quota])
+
+        # ID-only and BM25-only items: hydrate from the local catalog / chunk copy
+        catalog = get_catalog_index()
+        missing = []
+        for key in ranking:
+            if key in items:
+                continue
+            item_type, item_id = key
+            item = (catalog.get(item_id) if item_type == "product"
+                    else self.lexical.pdf_item(item_id, scores.get(key, 0)))
+            if item is not None:
+                items[key] = item
+            else:
+                missing.append(key)
+
+        # Not in the local copies (e.g. chunks uploaded before pdf_chunks.json): one fetch for the survivors
+        if missing:
+            self.stats["metadata_fetches"] += 1
+            fetched = await asyncio.to_thread(self.store.fetch_metadata, [item_id for _, item_id in missing])
+            for key in missing:
+                item = self._item_from_metadata(key[1], fetched.get(key[1], {}), scores.get(key, 0))
+                if item is not None:
+                    items[key] = item
 
-        items = []
-        
-        for match in results.get("matches", []):
-            metadata = match["metadata"].copy()
-            item_type = metadata.get("type")
-            
-            if item_type == "product":
-                # Convert to Product object
-                metadata.pop("type", None)
-                try:
-                    product = Product(**metadata)
-                    items.append(product)
-                except Exception as e:
-                    print(f"⚠️  Could not parse product: {e}")
-            
-            elif item_type == "pdf_document":
-                # Keep as dict with all metadata
-                items.append({
-                    "type": "pdf_document",
-                    "text": metadata.get("text", ""),
-                    "filename": metadata.get("filename", ""),
-                    "document_id": metadata.get("document_id", ""),
-                    "score": match.get("score", 0)
-                })
+        ordered = [items[key] for key in ranking if key in items]
 
         # Filter only available products (not PDFs)
-        products_only = [item for item in items if isinstance(item, Product)]
+        products_only = [item for item in ordered if isinstance(item, Product)]
         filtered_products = filter_available_products(products_only)
-        
+
         # Combine filtered products with PDF documents
-        pdf_docs = [item for item in items if isinstance(item, dict)]
-        
+        pdf_docs = [item for item in ordered if isinstance(item, dict)]
+
         # Return products first, then PDFs
-        return filtered_products + pdf_docs
+        results = filtered_products + pdf_docs
+        self.result_cache.set(cache_key, results)
+        return list(results)
+
+    def search(self, query: str, intent: str | None = None, top_k: int | None = None,
+               pdf_top_k: int | None = None) -> List[Union[Product, Dict]]:
+        """Synchronous wrapper of asearch() for the Flask routes and tools."""
+        return run_sync(self.asearch(query, intent=intent, top_k=top_k, pdf_top_k=pdf_top_k))
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "result_cache": self.result_cache.stats(),
+            "match_cache": self.match_cache.stats(),
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache is not None else None,
+        }
+
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever() -> ProductRetriever:
+    """Retriever partagé par tous les outils (un seul modèle, un seul cache)."""
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = ProductRetriever()
+    return _retriever
+
+
+def get_retriever_stats() -> dict:
+    return _retriever.get_stats() if _retriever is not None else {}
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import numpy as np
+
+# Bornes de l'histogramme de la meilleure similarité observée à chaque recherche
+SIMILARITY_BINS = (0.80, 0.85, 0.90, 0.93, 0.95, 0.97, 0.99)
+
+
+class SemanticCache:
+    """
+    Cache des réponses du store vectoriel indexé par l'embedding de la requête.
+    Une nouvelle requête réutilise la réponse d'une requête passée si leurs vecteurs
+    ont une similarité cosinus >= threshold (même filtre, top_k suffisant) :
+    "chemise blanche homme" et "chemises blanches pour homme" partagent une entrée.
+
+    Les vecteurs sont dans une matrice préallouée (max_entries x dim) : une recherche
+    est un seul produit matrice-vecteur. Remplacement FIFO circulaire, mémoire bornée.
+    Tout le cache est vidé quand la version du catalogue change ; une entrée plus
+    vieille que ttl secondes n'est plus servie (même durée que le cache de résultats).
+    """
+
+    def __init__(self, max_entries: int = 1024, threshold: float = 0.95, ttl: float = 600):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._vectors = None  # alloué à la première insertion (dimension du modèle)
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._namespaces = np.full(max_entries, -1, dtype=np.int32)
+        self._depths = np.zeros(max_entries, dtype=np.int32)
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._values = [None] * max_entries
+        self._namespace_codes = {}
+        self._next = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._histogram = np.zeros(len(SIMILARITY_BINS) + 1, dtype=np.int64)
+        self._similarity_sum = 0.0
+        self._similarity_count = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._valid.any():
+                self.invalidations += 1
+            self._valid[:] = False
+            self._values = [None] * self.max_entries
+            self._version = version
+
+    def get(self, vector, namespace: str, depth: int, version=None):
+        """Réponse en cache (tronquée à depth) pour un vecteur proche, sinon None."""
+        with self._lock:
+            self._check_version(version)
+            code = self._namespace_codes.get(namespace)
+            rows = None
+            if code is not None and self._vectors is not None:
+                rows = np.flatnonzero(self._valid & (self._namespaces == code) & (self._depths >= depth)
+                                      & (self._expires > time.monotonic()))
+            if rows is None or not len(rows):
+                self.misses += 1
+                return None
+
+            similarities = self._vectors[rows] @ self._normalize(vector)
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            self._histogram[np.searchsorted(SIMILARITY_BINS, similarity, side="right")] += 1
+            self._similarity_sum += similarity
+            self._similarity_count += 1
+
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._values[rows[best]][:depth]
+
+    def put(self, vector, namespace: str, depth: int, value, version=None):
+        vector = self._normalize(vector)
+        with self._lock:
+            self._check_version(version)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            code = self._namespace_codes.setdefault(namespace, len(self._namespace_codes))
+
+            row = self._next
+            self._vectors[row] = vector
+            self._namespaces[row] = code
+            self._depths[row] = depth
+            self._expires[row] = time.monotonic() + self.ttl
+            self._values[row] = value
+            self._valid[row] = True
+            self._next = (row + 1) % self.max_entries
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            labels = [f"<{SIMILARITY_BINS[0]}"] + [
+                f"{low}-{high}" for low, high in zip(SIMILARITY_BINS, SIMILARITY_BINS[1:])
+            ] + [f">={SIMILARITY_BINS[-1]}"]
+            return {
+                "size": int(self._valid.sum()),
+                "max_size": self.max_entries,
+                "threshold": self.threshold,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "mean_best_similarity": (
+                    round(self._similarity_sum / self._similarity_count, 4) if self._similarity_count else None
+                ),
+                "best_similarity_histogram": dict(zip(labels, self._histogram.tolist())),
+            }
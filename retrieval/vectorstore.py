@@ -1,31 +1,63 @@
-from pinecone import Pinecone, ServerlessSpec
+from typing import Protocol
+
+try:
+    from pinecone import Pinecone, ServerlessSpec
+except ImportError:  # backend local uniquement
+    Pinecone = ServerlessSpec = None
+
 from config.settings import (
     PINECONE_API_KEY,
     PINECONE_INDEX_NAME,
     PINECONE_CLOUD,
     PINECONE_REGION,
     EMBEDDING_DIMENSION,
+    VECTOR_STORE_BACKEND,
 )
 
 
+class VectorStore(Protocol):
+    """
+    Interface commune des stores vectoriels (Pinecone, local NumPy).
+
+    query() retourne {"matches": [{"id", "score", "metadata"}, ...]}, comme Pinecone ;
+    avec include_metadata=False seulement {"id", "score"} (métadonnées via fetch_metadata()).
+    Les filtres suivent la syntaxe Pinecone : {"type": {"$in": [...]}},
+    {"type": {"$eq": "product"}} ou {"document_id": "doc_..."}.
+    """
+
+    def upsert(self, vectors, batch_size=100): ...
+
+    def query(self, vector, top_k=5, filter=None, include_metadata=True): ...
+
+    def fetch_metadata(self, ids) -> dict: ...
+
+    def delete(self, ids=None, filter=None): ...
+
+    def stats(self) -> dict: ...
+
+
 class PineconeVectorStore:
-    def __init__(self, recreate_index=False):
+    def __init__(self, recreate_index=False, index_name=None):
         """
         recreate_index=True => supprime l'ancien index et recrée un index propre
         """
+        if Pinecone is None:
+            raise ImportError("pinecone package not installed. Run: pip install pinecone")
+
         self.pc = Pinecone(api_key=PINECONE_API_KEY)
+        self.index_name = index_name or PINECONE_INDEX_NAME
 
-        if recreate_index and PINECONE_INDEX_NAME in self.pc.list_indexes().names():
-            self.pc.delete_index(PINECONE_INDEX_NAME)
+        if recreate_index and self.index_name in self.pc.list_indexes().names():
+            self.pc.delete_index(self.index_name)
 
         self.index = self._get_or_create_index()
 
     def _get_or_create_index(self):
         existing = self.pc.list_indexes().names()
 
-        if PINECONE_INDEX_NAME not in existing:
+        if self.index_name not in existing:
             self.pc.create_index(
-                name=PINECONE_INDEX_NAME,
+                name=self.index_name,
                 dimension=EMBEDDING_DIMENSION,
                 metric="cosine",
                 spec=ServerlessSpec(
@@ -34,9 +66,9 @@ class PineconeVectorStore:
                 ),
             )
 
-        return self.pc.Index(PINECONE_INDEX_NAME)
+        return self.pc.Index(self.index_name)
 
-    def upsert(self, vectors):
+    def upsert(self, vectors, batch_size=100):
         """
         vectors = [
             {
@@ -51,13 +83,49 @@ class PineconeVectorStore:
             print("⚠️ Aucun vecteur à upserter !")
             return
 
-        self.index.upsert(vectors=vectors)
+        # Pinecone limite la taille d'une requête : envoyer par lots
+        for i in range(0, len(vectors), batch_size):
+            self.index.upsert(vectors=vectors[i:i + batch_size])
         print(f"✅ {len(vectors)} vecteurs upsertés dans Pinecone.")
 
-    def query(self, vector, top_k=5, filter=None):
+    def query(self, vector, top_k=5, filter=None, include_metadata=True):
         return self.index.query(
             vector=vector,
             top_k=top_k,
-            include_metadata=True,
+            include_metadata=include_metadata,
             filter=filter,
         )
+
+    def fetch_metadata(self, ids) -> dict:
+        ids = list(ids)
+        if not ids:
+            return {}
+        response = self.index.fetch(ids=ids)
+        return {vid: dict(vec.metadata or {}) for vid, vec in response.vectors.items()}
+
+    def delete(self, ids=None, filter=None):
+        if ids:
+            self.index.delete(ids=list(ids))
+        elif filter:
+            self.index.delete(filter=filter)
+
+    def stats(self) -> dict:
+        stats = self.index.describe_index_stats()
+        return {
+            "backend": "pinecone",
+            "total_vector_count": stats.get("total_vector_count", 0),
+            "dimension": stats.get("dimension", EMBEDDING_DIMENSION),
+            "index_fullness": stats.get("index_fullness", 0),
+        }
+
+
+def get_vector_store(recreate_index=False, index_name=None) -> VectorStore:
+    """Instancie le backend choisi par VECTOR_STORE_BACKEND ("pinecone" ou "local")."""
+    if VECTOR_STORE_BACKEND == "local":
+        from retrieval.local_vectorstore import LocalVectorStore
+        return LocalVectorStore(recreate_index=recreate_index)
+
+    if VECTOR_STORE_BACKEND == "pinecone":
+        return PineconeVectorStore(recreate_index=recreate_index, index_name=index_name)
+
+    raise ValueError(f"Unknown vector store backend: {VECTOR_STORE_BACKEND}")
@@ -1,3 +1,5 @@
+from catalog.index import get_catalog_index
+
 
 def add_product_to_cart(product):
     """
@@ -12,6 +14,14 @@ def add_product_to_cart(product):
             "error": "❌ Impossible d'ajouter le produit au panier."
         }
     
+    # Stock vérifié sur l'index catalogue en mémoire (pas de lecture disque)
+    catalog = get_catalog_index()
+    if catalog.get(product["id"]) is not None and not catalog.is_available(product["id"]):
+        return {
+            "success": False,
+            "error": f"❌ **{product['name']}** est actuellement en rupture de stock."
+        }
+
     # Add to cart (your existing logic)
     # st.session_state.cart.append({
     #     "id": product["id"],
@@ -1,43 +1,52 @@
-from retrieval.retriever import ProductRetriever
+from retrieval.retriever import get_retriever
 from catalog.schema import Product
 
 
-retriever = ProductRetriever(top_k=10)
+IMAGE_SEARCH_TOP_K = 10
 
 
-def search_product_image(user_input: str):
-    products = retriever.search(user_input)
-    
+def _image_result(product):
+    """Payload image attendu par l'agent, depuis un Product ou un dict du working set."""
+    get = product.get if isinstance(product, dict) else (lambda k, d=None: getattr(product, k, d))
+    image_url = get("image_url")
+    if not image_url:
+        return None
+    return {
+        "id": get("id"),
+        "name": get("name"),
+        "category": get("category"),
+        "price": get("price"),
+        "in_stock": get("in_stock", False),
+        "image_url": image_url
+    }
+
+
+def search_product_image(user_input: str, working_set=None):
+    # 0️⃣ Produit déjà montré dans la conversation ("le deuxième", nom, SKU) : pas de recherche
+    if working_set is not None:
+        known = working_set.resolve(user_input)
+        if known and _image_result(known):
+            return _image_result(known)
+
+    products = get_retriever().search(user_input, top_k=IMAGE_SEARCH_TOP_K)
+
     # 1️⃣ Vector search
     for product in products:
-        product_dict = product.__dict__
-        image_url = product_dict.get("image_url")
-        if image_url:
-            return {
-                "id": product_dict["id"],
-                "name": product_dict["name"],
-                "category": product_dict.get("category"),
-                "price": product_dict.get("price"),
-                "in_stock": product_dict.get("in_stock", False),
-                "image_url": image_url
-            }
+        if isinstance(product, Product) and _image_result(product):
+            if working_set is not None:
+                working_set.add([product], shown=False)
+            return _image_result(product)
 
     # 2️⃣ Fallback keyword (plus permissif)
     query_words = [w.lower() for w in user_input.split() if len(w) > 2]
     for product in products:
-        product_dict = product.__dict__
-        name_lower = product_dict.get("name", "").lower()
+        if not isinstance(product, Product):
+            continue
+        name_lower = product.name.lower()
         # Permissif : match n'importe quel mot
-        if any(word in name_lower for word in query_words):
-            image_url = product_dict.get("image_url")
-            if image_url:
-                return {
-                    "id": product_dict["id"],
-                    "name": product_dict["name"],
-                    "category": product_dict.get("category"),
-                    "price": product_dict.get("price"),
-                    "in_stock": product_dict.get("in_stock", False),
-                    "image_url": image_url
-                }
+        if any(word in name_lower for word in query_words) and _image_result(product):
+            if working_set is not None:
+                working_set.add([product], shown=False)
+            return _image_result(product)
 
     return None
@@ -1,42 +1,47 @@
 # search_products.py - FIXED to handle PDFs
-from retrieval.retriever import ProductRetriever
+from retrieval.retriever import get_retriever
 from catalog.validator import products_to_context
-from rapidfuzz import fuzz
+from retrieval.postfilter import fuzzy_filter
 
 
-retriever = ProductRetriever()
+SEARCH_TOP_K = 3
 
-def search_products(query: str) -> str:
+
+def find_products(query: str, working_set=None, results=None):
     """
     Recherche des produits ET documents PDF correspondant à la requête.
     - Gère à la fois les produits (JSON) et les PDFs uploadés
     - Utilise une recherche floue pour gérer pluriel/singulier et petites fautes
+    - working_set : les produits affichés y sont mémorisés pour les relances
+      ("le deuxième", image, prix) sans nouvelle recherche
+    - results : candidats déjà récupérés (recherche spéculative), filtrés pour query
+    Retourne (produits, chunks PDF) ; search_products() en fait le texte pour le LLM.
     """
-    results = retriever.search(query)
+    retriever = get_retriever()
+    if results is None:
+        results = retriever.search(query, top_k=SEARCH_TOP_K)
     
     if not results:
-        return "Aucun produit trouvé."
+        return [], []
     
-    query_lower = query.lower()
+    # Résultats trouvés par l'index lexical (BM25) : gardés même si le score flou est bas
+    lexical_ids = retriever.lexical_match_ids(query, top_k=SEARCH_TOP_K)
     
-    # Séparer les produits et les PDFs
-    products = []
-    pdf_matches = []
+    # Séparer les produits et les PDFs, filtrage flou en un seul calcul vectorisé
+    products, pdf_matches = fuzzy_filter(query, results, lexical_ids)
     
-    for item in results:
-        # Check if it's a Product object or a dict (PDF document)
-        if hasattr(item, 'name'):  # It's a Product object
-            # Filtrage avec recherche floue
-            if (fuzz.partial_ratio(query_lower, item.name.lower()) > 70 or 
-                fuzz.partial_ratio(query_lower, item.category.lower()) > 70):
-                products.append(item)
-        
-        elif isinstance(item, dict):  # It's a PDF document
-            # Check if query matches text content
-            text = item.get('text', '')
-            if query_lower in text.lower() or fuzz.partial_ratio(query_lower, text.lower()) > 75:
-                pdf_matches.append(item)
+    if working_set is not None and products:
+        working_set.add(products)
     
+    return products, pdf_matches
+
+
+def search_products(query: str, working_set=None) -> str:
+    products, pdf_matches = find_products(query, working_set)
+    return format_search_results(query, products, pdf_matches)
+
+
+def format_search_results(query: str, products, pdf_matches) -> str:
     # Build response
     response_parts = []
     